@@ -0,0 +1,95 @@
+"""Cold-start budget: import time of the app and CLI entry modules, measured with python -X importtime
+
+Each module is imported in a fresh interpreter. A module over its budget, or one that pulls in a
+dependency meant to load on first use (the OpenAI SDK, httpx, psutil), fails the run with a
+non-zero exit status, so the check can guard cold start in CI.
+
+Usage: python benchmarks/bench_import_time.py [--repeat 5] [--budget app=500 --budget llm=100 ...]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Milliseconds allowed for a cold import of each entry module
+DEFAULT_BUDGETS_MS = {
+    'app': 500,
+    'batch': 250,
+    'llm': 100,
+}
+# Loaded on first use (or by the app's background pre-warm), never while importing
+DEFERRED_MODULES = ('openai', 'httpx', 'psutil', 'langchain')
+SLOWEST_SHOWN = 5
+
+def import_times(module, cwd):
+    """{module imported by the import of module: cumulative us}, module itself included"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, PYTHONDONTWRITEBYTECODE='1', PREWARM='false')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    # Lines come out in completion order, so the target's imports are the ones since the previous
+    # top-level entry (startup imports such as site and its .pth files come before it)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip())
+        if depth == 1 and name.strip() != module:
+            times = {}
+            continue
+        times[name.strip()] = int(cumulative_us)
+        if name.strip() == module:
+            return times
+    raise RuntimeError(f"No import time reported for {module}")
+
+def parse_budgets(values):
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for value in values or ():
+        module, _, budget = value.partition('=')
+        try:
+            budgets[module.strip()] = float(budget)
+        except ValueError:
+            raise SystemExit(f"Invalid budget {value!r}; use module=milliseconds")
+    return budgets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Cold imports per module (best time is reported)')
+    parser.add_argument('--budget', action='append', metavar='MODULE=MS',
+                        help='Import budget in milliseconds; repeat for several modules')
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    failures = []
+    # Run outside the repo, so the app's security.log handler does not touch tracked files
+    with tempfile.TemporaryDirectory() as cwd:
+        for module, budget in budgets.items():
+            runs = [import_times(module, cwd) for _ in range(max(1, args.repeat))]
+            best = min(runs, key=lambda times: times[module])
+            elapsed_ms = best[module] / 1000
+            status = 'ok' if elapsed_ms <= budget else 'OVER BUDGET'
+            print(f"{module:<10} {elapsed_ms:8.1f} ms  (budget {budget:g} ms)  {status}")
+
+            slowest = sorted(((cumulative, name) for name, cumulative in best.items()
+                              if name != module and '.' not in name), reverse=True)[:SLOWEST_SHOWN]
+            for cumulative, name in slowest:
+                print(f"    {name:<24} {cumulative / 1000:8.1f} ms")
+
+            deferred = sorted(name for name in best if name in DEFERRED_MODULES)
+            if deferred:
+                print(f"    imported eagerly: {', '.join(deferred)}")
+                failures.append(f"{module} imports {', '.join(deferred)}")
+            if elapsed_ms > budget:
+                failures.append(f"{module} took {elapsed_ms:.1f} ms (budget {budget:g} ms)")
+
+    if failures:
+        print("\nCold start budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
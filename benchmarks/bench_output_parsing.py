@@ -0,0 +1,136 @@
+"""Micro-benchmark: splitting LLM analysis output into thinking, steps, TLDR and metadata
+
+Compares the original regex cascade of parse_analysis_output with the single-pass
+SectionScanner, on a large well-formed output, on malformed outputs (unclosed <think>
+tags, repeated TLDR headings, one huge line) and on the same text fed as streamed tokens.
+The legacy parser drops the metadata whenever a TLDR heading is present, so well-formed
+outputs are expected to differ from it in that section only.
+
+Usage: python benchmarks/bench_output_parsing.py [--size-mb 2] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sections import SectionScanner, split_sections
+
+TOKEN_SIZE = 16  # Characters per streamed delta, about four tokens
+
+STEP_TEMPLATE = """### Step {n}: Review the events around 12:{minute:02d}
+- `interface GigabitEthernet0/{n} changed state to down` repeats every few seconds
+- The SIP registrar rejects re-registration with 403 right after each flap
+
+"""
+WELL_FORMED_HEAD = "<think>\nThe flaps line up with the registration failures.\n</think>\n\n## 🔍 Step-by-Step Analysis\n\n"
+WELL_FORMED_TAIL = """## 📋 TLDR - Main Issue Summary
+
+**Root cause:** uplink flapping on the access switch drops phone registrations.
+
+---
+
+--- ANALYSIS METADATA ---
+Model: test-model
+Duration: 12.3s
+"""
+
+def legacy_parse(analysis_text):
+    """The original regex cascade from parse_analysis_output, kept for comparison"""
+    result = {'thinking': '', 'step_analysis': '', 'tldr': '', 'metadata': '', 'raw_output': analysis_text}
+    think_patterns = [
+        r'<think>(.*?)</think>',
+        r'<THINK>(.*?)</THINK>',
+        r'<think>\s*(.*?)\s*</think>'
+    ]
+    for pattern in think_patterns:
+        think_match = re.search(pattern, analysis_text, re.DOTALL | re.IGNORECASE)
+        if think_match:
+            result['thinking'] = think_match.group(1).strip()
+            analysis_text = re.sub(pattern, '', analysis_text, flags=re.DOTALL | re.IGNORECASE)
+            break
+
+    tldr_patterns = [
+        r'\*\*TLDR:\*\*\s*\n(.*?)(?=\n\n\*\*|$)',
+        r'##\s*📋\s*TLDR[^\n]*\n\n(.*?)(?=\n\n---|$)',
+        r'##\s*📋\s*TLDR[^\n]*\n(.*?)(?=\n\n---|$)',
+        r'##\s*TLDR[^\n]*\n\n(.*?)(?=\n\n---|$)',
+        r'##\s*📋\s*TLDR[^\n]*\n\n(.*)',
+        r'##\s*TLDR[^\n]*\n\n(.*)',
+        r'TLDR[^\n]*\n\n(.*?)(?=\n\n---|$)',
+        r'TLDR[^\n]*\n(.*?)(?=\n\n---|$)'
+    ]
+    for pattern in tldr_patterns:
+        tldr_match = re.search(pattern, analysis_text, re.DOTALL | re.IGNORECASE)
+        if tldr_match:
+            result['tldr'] = tldr_match.group(1).strip()
+            analysis_text = re.sub(r'\*\*TLDR:\*\*.*?(?=\n\n\*\*|$)', '', analysis_text, flags=re.DOTALL | re.IGNORECASE)
+            analysis_text = re.sub(r'##\s*📋?\s*TLDR.*', '', analysis_text, flags=re.DOTALL | re.IGNORECASE)
+            break
+
+    metadata_match = re.search(r'--- ANALYSIS METADATA ---\n(.*)', analysis_text, re.DOTALL)
+    if metadata_match:
+        result['metadata'] = metadata_match.group(1).strip()
+        analysis_text = re.sub(r'\n\n--- ANALYSIS METADATA ---.*', '', analysis_text, flags=re.DOTALL)
+
+    result['step_analysis'] = analysis_text.strip()
+    if not result['thinking'] and not result['tldr'] and not result['step_analysis']:
+        result['step_analysis'] = result['raw_output']
+    return result
+
+def repeat_to(unit, size):
+    return unit * max(1, size // len(unit))
+
+def outputs(size):
+    """(name, text) of the model outputs to parse, each about size characters"""
+    steps = "".join(STEP_TEMPLATE.format(n=n, minute=n % 60) for n in range(size // len(STEP_TEMPLATE) + 1))
+    return [
+        ('well-formed', WELL_FORMED_HEAD + steps[:size] + "\n\n" + WELL_FORMED_TAIL),
+        # Smaller: the legacy lazy <think> patterns rescan the rest of the text from every tag
+        ('unclosed <think> tags', repeat_to("<think> checking the uplink again\n", size // 64)),
+        ('repeated **TLDR:** headings', repeat_to("**TLDR:**\nuplink flapping\n", size // 4)),
+        ('one huge line', "## 📋 TLDR " + repeat_to("flap <think ", size)),
+    ]
+
+def streamed(text):
+    """Sections of the text fed to the scanner a few tokens at a time"""
+    scanner = SectionScanner(lambda name, section: None)
+    for i in range(0, len(text), TOKEN_SIZE):
+        scanner.feed(text[i:i + TOKEN_SIZE])
+    return scanner.close()
+
+def best_time(func, text, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=2, help='Size of each model output in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (best time is reported)')
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"{args.size_mb:g} MB per output, best of {args.repeat}\n")
+
+    for output_name, text in outputs(size):
+        print(output_name)
+        legacy_elapsed, legacy = best_time(legacy_parse, text, args.repeat)
+        print(f"  {'legacy regex cascade':<28} {legacy_elapsed:8.3f}s")
+        elapsed, whole = best_time(split_sections, text, args.repeat)
+        differs = [name for name in whole if whole[name] != legacy[name]]
+        note = f"  (differs from legacy in: {', '.join(differs)})" if differs else ''
+        print(f"  {'single pass':<28} {elapsed:8.3f}s  x{legacy_elapsed / elapsed:.2f}{note}")
+        elapsed, tokens = best_time(streamed, text, args.repeat)
+        note = '' if tokens == whole else '  (differs from the whole-text scan!)'
+        print(f"  {f'single pass, {TOKEN_SIZE}-char deltas':<28} {elapsed:8.3f}s  x{legacy_elapsed / elapsed:.2f}{note}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
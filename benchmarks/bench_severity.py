@@ -0,0 +1,55 @@
+"""Micro-benchmark: severity classification throughput for parse_text_logs
+
+Usage: python benchmarks/bench_severity.py [--lines 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from severity import get_classifier
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_complex.txt')
+
+def legacy_classify(line):
+    """The original keyword chain from parse_text_logs, kept for comparison"""
+    if any(keyword in line.upper() for keyword in ['ERROR', 'CRITICAL', 'FATAL']):
+        return 'error'
+    elif any(keyword in line.upper() for keyword in ['WARN', 'WARNING']):
+        return 'warn'
+    elif any(keyword in line.upper() for keyword in ['INFO', 'DEBUG', 'TRACE']):
+        return 'info'
+    return 'unknown'
+
+def load_lines(count):
+    """Repeat the sample syslog dump until it has the requested number of lines"""
+    with open(SAMPLE_PATH, 'r', encoding='utf-8') as f:
+        sample = [line for line in f.read().split('\n') if line.strip()]
+    return (sample * (count // len(sample) + 1))[:count]
+
+def measure(name, lines, run):
+    start = time.perf_counter()
+    run(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {len(lines) / elapsed:>14,.0f} lines/sec")
+    return elapsed
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--lines', type=int, default=1000000)
+    args = arg_parser.parse_args()
+
+    lines = load_lines(args.lines)
+    substring = get_classifier(word_boundary=False)
+    word = get_classifier(word_boundary=True)
+
+    print(f"Classifying {len(lines):,} lines from {os.path.basename(SAMPLE_PATH)}")
+    before = measure("before: legacy keyword chain", lines, lambda ls: [legacy_classify(l) for l in ls])
+    after = measure("after: substring mode", lines, lambda ls: [substring.classify(l) for l in ls])
+    after_word = measure("after: word-boundary mode", lines, lambda ls: [word.classify(l) for l in ls])
+    print(f"Speedup: {before / after:.2f}x (substring), {before / after_word:.2f}x (word boundary)")
+
+if __name__ == '__main__':
+    main()
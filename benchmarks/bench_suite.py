@@ -0,0 +1,253 @@
+"""Benchmark suite: parser, detection, sanitizer, output parsing and end-to-end /analyze
+
+Each case runs in a fresh process so its peak RSS is its own. Results are written as JSON;
+pass --compare with an earlier results file to flag regressions.
+
+Usage: python benchmarks/bench_suite.py [--size-mb 5] [--repeat 3] [--output bench_results.json]
+                                        [--compare previous.json] [--skip-e2e] [--llm-latency 0.2]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_logs import FORMATS, write_log
+
+REGRESSION_THRESHOLD = 0.10  # Slower than the comparison run by more than this is reported
+RATE_KEYS = ('mb_per_sec', 'calls_per_sec', 'requests_per_sec')
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def best_of(repeat, run):
+    """Fastest of several runs, and the last run's return value"""
+    best = None
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+def case_parse_log(path, repeat):
+    from parser import parse_log
+    size = os.path.getsize(path)
+    seconds, text = best_of(repeat, lambda: parse_log(path))
+    lines = text.count('\n') + 1
+    return {'bytes': size, 'lines': lines, 'seconds': seconds,
+            'mb_per_sec': size / seconds / 1e6, 'lines_per_sec': lines / seconds}
+
+def case_detect_log_format(path, repeat):
+    from parser import detect_log_format
+    calls = 200
+    seconds, log_format = best_of(repeat, lambda: [detect_log_format(path) for _ in range(calls)][-1])
+    return {'calls': calls, 'seconds': seconds, 'calls_per_sec': calls / seconds, 'detected': log_format}
+
+def case_sanitize_input(path, repeat):
+    from parser import parse_log
+    from llm import sanitize_input, MAX_LOG_SIZE
+    text = parse_log(path)
+    # sanitize_input truncates at MAX_LOG_SIZE, so feed it the log one prompt-sized piece at a time
+    pieces = [text[i:i + MAX_LOG_SIZE] for i in range(0, len(text), MAX_LOG_SIZE)]
+    seconds, _ = best_of(repeat, lambda: [sanitize_input(piece) for piece in pieces])
+    return {'bytes': len(text), 'seconds': seconds, 'mb_per_sec': len(text) / seconds / 1e6}
+
+def case_validate_log_content(path, repeat):
+    from parser import parse_log
+    from llm import validate_log_content
+    text = parse_log(path)
+    seconds, outcome = best_of(repeat, lambda: validate_log_content(text))
+    return {'bytes': len(text), 'seconds': seconds, 'mb_per_sec': len(text) / seconds / 1e6, 'valid': outcome[0]}
+
+def case_parse_analysis_output(path, repeat):
+    from llm import parse_analysis_output
+    from mock_llm_server import CANNED_ANALYSIS
+    calls = 2000
+    text = CANNED_ANALYSIS + "\n\n--- ANALYSIS METADATA ---\nModel: mock-model\nAnalysis Time: 1.0s"
+    seconds, _ = best_of(repeat, lambda: [parse_analysis_output(text) for _ in range(calls)])
+    return {'calls': calls, 'seconds': seconds, 'calls_per_sec': calls / seconds}
+
+def start_mock_llm(latency, chunk_delay):
+    """Mock OpenAI endpoint on a free local port, served from a daemon thread"""
+    from http.server import ThreadingHTTPServer
+    from mock_llm_server import MockLLMHandler
+    MockLLMHandler.first_token_delay = latency
+    MockLLMHandler.chunk_delay = chunk_delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def case_analyze_e2e(paths, requests, latency, chunk_delay):
+    """POST uploads to /analyze and wait for each result, with the LLM replaced by the mock endpoint"""
+    os.environ['OPENAI_API_BASE'] = start_mock_llm(latency, chunk_delay)
+    os.environ.pop('OPENAI_API_BASES', None)
+    # The app writes its security log and uploads relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='causewise-bench-'))
+    from app import app, limiter
+    limiter.enabled = False
+    client = app.test_client()
+
+    timings = []
+    start = time.perf_counter()
+    for index in range(requests):
+        path = paths[index % len(paths)]
+        request_start = time.perf_counter()
+        with open(path, 'rb') as f:
+            response = client.post('/analyze', data={'incident_file': (f, f"run{index}_{os.path.basename(path)}")},
+                                   headers={'Accept': 'application/json'}, content_type='multipart/form-data')
+        if response.status_code != 202:
+            raise RuntimeError(f"/analyze returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        job_id = response.get_json()['job_id']
+        while True:
+            result = client.get(f"/result/{job_id}?format=json")
+            if result.status_code != 202:
+                break
+            time.sleep(0.01)
+        body = result.get_json()
+        if body.get('status') != 'completed' or body['analysis'].startswith(('Error', 'Security Error')):
+            raise RuntimeError(f"Analysis failed: {str(body.get('analysis') or body.get('error'))[:200]}")
+        timings.append(time.perf_counter() - request_start)
+    seconds = time.perf_counter() - start
+    timings.sort()
+    return {'requests': requests, 'seconds': seconds, 'requests_per_sec': requests / seconds,
+            'llm_latency': latency, 'p50_seconds': timings[len(timings) // 2], 'max_seconds': timings[-1]}
+
+CASES = {
+    'parse_log': case_parse_log,
+    'detect_log_format': case_detect_log_format,
+    'sanitize_input': case_sanitize_input,
+    'validate_log_content': case_validate_log_content,
+    'parse_analysis_output': case_parse_analysis_output,
+    'analyze_e2e': case_analyze_e2e,
+}
+
+def _run_case(queue, name, args):
+    try:
+        result = CASES[name](*args)
+        result['peak_rss_mb'] = peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def run_isolated(name, *args):
+    """Run one case in a fresh interpreter so imports and allocations of other cases do not count"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_case, args=(queue, name, args))
+    process.start()
+    result = queue.get()
+    process.join()
+    for key, value in result.items():
+        if isinstance(value, float):
+            result[key] = round(value, 4 if value < 100 else 1)
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results, previous_path, threshold=REGRESSION_THRESHOLD):
+    """Print cases whose throughput dropped against an earlier results file; returns how many regressed"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r['case'], r.get('format')): r for r in json.load(f)['results']}
+    regressions = 0
+    for result in results:
+        before = previous.get((result['case'], result.get('format')))
+        # Rates rather than seconds, so runs with different --size-mb remain comparable
+        rate = next((key for key in RATE_KEYS if key in result), None)
+        if not before or not rate or not before.get(rate):
+            continue
+        change = (before[rate] - result[rate]) / before[rate]
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['case']:<22} {result.get('format') or '':<8} "
+                  f"{rate} {before[rate]} -> {result[rate]} (-{change:.0%})")
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size-mb', type=float, default=5, help='Size of each synthetic log')
+    arg_parser.add_argument('--formats', default=",".join(FORMATS))
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the fastest is reported')
+    arg_parser.add_argument('--output', default='bench_results.json')
+    arg_parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    arg_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                            help='Throughput drop reported as a regression (0.10 = 10%%)')
+    arg_parser.add_argument('--skip-e2e', action='store_true', help='Skip the end-to-end /analyze run')
+    arg_parser.add_argument('--e2e-requests', type=int, default=10)
+    arg_parser.add_argument('--e2e-size-mb', type=float, default=0.5, help='Size of each uploaded log')
+    arg_parser.add_argument('--llm-latency', type=float, default=0.2, help='Mock LLM seconds before the first token')
+    arg_parser.add_argument('--llm-chunk-delay', type=float, default=0.0, help='Mock LLM seconds between chunks')
+    args = arg_parser.parse_args()
+
+    formats = args.formats.split(',')
+    workdir = tempfile.mkdtemp(prefix='causewise-logs-')
+    size = int(args.size_mb * 1024 * 1024)
+    paths = {log_format: write_log(log_format, size, workdir, args.seed) for log_format in formats}
+
+    results = []
+
+    def record(case, log_format, result):
+        entry = dict(case=case, format=log_format, **result)
+        results.append(entry)
+        detail = entry.get('error') or ", ".join(
+            f"{key}={value}" for key, value in result.items() if key in ('seconds', 'mb_per_sec', 'lines_per_sec',
+                                                                         'calls_per_sec', 'requests_per_sec',
+                                                                         'peak_rss_mb'))
+        print(f"{case:<22} {log_format or '':<8} {detail}")
+
+    for case in ('parse_log', 'detect_log_format', 'sanitize_input', 'validate_log_content'):
+        for log_format, path in paths.items():
+            record(case, log_format, run_isolated(case, path, args.repeat))
+    record('parse_analysis_output', None, run_isolated('parse_analysis_output', None, args.repeat))
+
+    if not args.skip_e2e:
+        e2e_size = int(args.e2e_size_mb * 1024 * 1024)
+        # A distinct log per request, so the result cache does not answer repeats
+        uploads = [write_log(formats[i % len(formats)], e2e_size, workdir, args.seed + 1 + i)
+                   for i in range(args.e2e_requests)]
+        record('analyze_e2e', None, run_isolated('analyze_e2e', uploads, args.e2e_requests,
+                                                 args.llm_latency, args.llm_chunk_delay))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            return 1
+    return 1 if any('error' in r for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Stand-in for the LM Studio chat completions API that returns a canned RCA
+
+Streams the canned answer in small chunks when the request sets stream=true, so
+token streaming and time-to-first-token can be checked without a model.
+
+Usage: python benchmarks/mock_llm_server.py [--port 1234] [--first-token-delay 0.5] [--chunk-delay 0.02]
+Then start the app with OPENAI_API_BASE=http://127.0.0.1:1234/v1
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANALYSIS = """<think>
+The log shows repeated database connection timeouts followed by request failures.
+</think>
+
+## 🔍 Step-by-Step Analysis
+
+### Step 1: Log Entry Review
+Connection pool errors begin before the first HTTP 500 responses.
+
+### Step 2: Pattern Identification
+Every failed request follows a database timeout on the same host.
+
+### Step 3: Root Cause Determination
+The database connection pool was exhausted.
+
+### Step 4: Impact Assessment
+User requests failed until the pool recovered.
+
+### Step 5: Recommendations
+Increase the pool size and add alerting on pool saturation.
+
+## 📋 TLDR - Main Issue Summary
+**Root Cause**: Database connection pool exhaustion
+**Impact**: Failed user requests
+**Fix**: Increase the pool size and monitor saturation
+"""
+
+def chunk_text(text, size=12):
+    """Split the canned answer into token-sized pieces"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /v1/models and /v1/chat/completions"""
+    first_token_delay = 0.5
+    chunk_delay = 0.02
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first, e.g. when exercising read timeouts
+            pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json({'object': 'list', 'data': [{'id': 'mock-model', 'object': 'model', 'owned_by': 'mock'}]})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json({'error': 'not found'}, 404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        model = request.get('model', 'mock-model')
+        created = int(time.time())
+        time.sleep(self.first_token_delay)
+
+        if not request.get('stream'):
+            self._send_json({
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': CANNED_ANALYSIS}}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        for index, piece in enumerate(chunk_text(CANNED_ANALYSIS)):
+            delta = {'content': piece}
+            if index == 0:
+                delta['role'] = 'assistant'
+            self._send_event({
+                'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]
+            })
+            time.sleep(self.chunk_delay)
+        self._send_event({
+            'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        })
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1234)
+    parser.add_argument('--first-token-delay', type=float, default=0.5, help='Seconds before the first chunk')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Seconds between streamed chunks')
+    args = parser.parse_args()
+
+    MockLLMHandler.first_token_delay = args.first_token_delay
+    MockLLMHandler.chunk_delay = args.chunk_delay
+    server = ThreadingHTTPServer((args.host, args.port), MockLLMHandler)
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Deterministic synthetic incident logs in every supported format, modeled on the samples in data/
+
+Usage: python benchmarks/synthetic_logs.py [--size-mb 10] [--seed 42] [--output-dir /tmp/causewise-logs]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+START_TIME = datetime(2024, 7, 29, 12, 45, 10)
+HOSTS = ['web-01', 'web-02', 'db-prod-01', 'cache-01', 'lb-01']
+COMPONENTS = ['ConnectionPool', 'RetryHandler', 'PostgreSQL', 'HttpServer', 'AuthService', 'Scheduler']
+LEVELS = ['INFO'] * 6 + ['DEBUG'] * 2 + ['WARN'] * 2 + ['ERROR']
+MESSAGES = [
+    "Connection timeout to database server db-prod-01:5432 after {n}s",
+    "Attempting reconnection (attempt {n}/3)",
+    "DEADLOCK DETECTED: Process {n} was waiting for ShareLock on transaction {id}",
+    "Request GET /api/orders/{id} completed in {n}ms",
+    "Cache miss for key session:{id}",
+    "Worker {n} picked up job {id}",
+    "Out of memory: Killed process {id} (java) total-vm:{n}kB",
+    "User {id} authenticated from 192.168.1.{n}",
+]
+CISCO_EVENTS = [
+    ("LINK", 3, "UPDOWN", "Interface GigabitEthernet0/{n}, changed state to down"),
+    ("LINEPROTO", 5, "UPDOWN", "Line protocol on Interface GigabitEthernet0/{n}, changed state to up"),
+    ("OSPF", 5, "ADJCHG", "Process 1, Nbr 10.1.1.{n} on GigabitEthernet0/1 from FULL to DOWN, Neighbor Down"),
+    ("SYS", 5, "CONFIG_I", "Configured from console by admin on vty0 (192.168.1.{n})"),
+    ("SEC", 6, "IPACCESSLOGP", "list 101 denied tcp 10.0.0.{n}(4431) -> 10.0.1.1(22), 1 packet"),
+    ("PLATFORM", 2, "CRASHDUMP", "System crashed, writing core dump for process {id}"),
+]
+POLYCOM_EVENTS = [
+    ("INFO", "SipStack", "SIP/2.0 200 OK received from 192.168.1.{n}:5060"),
+    ("WARN", "AudioManager", "RTP packet loss detected: {n}.2% on call ID {id}"),
+    ("ERROR", "NetworkManager", "Failed to register with SIP server 192.168.1.{n}: Connection timeout"),
+    ("INFO", "CallManager", "Call established: Extension 10{n} -> Extension 1002"),
+    ("DEBUG", "Codec", "Negotiated G.722 for call ID {id}"),
+]
+FORMATS = ('text', 'cisco', 'polycom', 'json', 'csv')
+EXTENSIONS = {'text': '.log', 'cisco': '.log', 'polycom': '.log', 'json': '.json', 'csv': '.csv'}
+
+def _message(rng):
+    return rng.choice(MESSAGES).format(n=rng.randint(1, 250), id=rng.randint(10000, 99999))
+
+def _times(rng):
+    moment = START_TIME
+    while True:
+        moment += timedelta(milliseconds=rng.randint(1, 1500))
+        yield moment
+
+def text_lines(rng):
+    """Syslog-style lines as in sample_complex.txt"""
+    for moment in _times(rng):
+        host = rng.choice(HOSTS)
+        level = rng.choice(LEVELS)
+        yield f"{moment:%b %d %H:%M:%S} {host} app[{rng.randint(1000, 9999)}]: [{level.lower()}] {_message(rng)}"
+
+def cisco_lines(rng):
+    """Cisco IOS lines as in sample_cisco.log"""
+    for moment in _times(rng):
+        facility, severity, mnemonic, text = rng.choice(CISCO_EVENTS)
+        text = text.format(n=rng.randint(1, 48), id=rng.randint(100, 9999))
+        yield f"*{moment:%b %d %H:%M:%S}.{moment.microsecond // 1000:03d}: %{facility}-{severity}-{mnemonic}: {text}"
+
+def polycom_lines(rng):
+    """Polycom VoIP lines as in sample_polycom.log"""
+    for moment in _times(rng):
+        level, component, text = rng.choice(POLYCOM_EVENTS)
+        text = text.format(n=rng.randint(1, 99), id=rng.randint(1000000000, 9999999999))
+        yield f"{moment:%Y-%m-%d %H:%M:%S},{moment.microsecond // 1000:03d} {level:<5} [{component}] {text}"
+
+def json_events(rng):
+    """Splunk export events as in sample_splunk.json"""
+    for moment in _times(rng):
+        level = rng.choice(LEVELS)
+        component = rng.choice(COMPONENTS)
+        message = _message(rng)
+        yield {
+            "_time": f"{moment:%Y-%m-%dT%H:%M:%S}.{moment.microsecond // 1000:03d}Z",
+            "host": rng.choice(HOSTS),
+            "source": "/var/log/application.log",
+            "sourcetype": "application_logs",
+            "index": "main",
+            "_raw": f"{moment:%Y-%m-%d %H:%M:%S} {level} [{component}] {message}",
+            "level": level,
+            "component": component,
+            "message": message
+        }
+
+def csv_rows(rng):
+    for moment in _times(rng):
+        yield [f"{moment:%Y-%m-%d %H:%M:%S}", rng.choice(LEVELS), rng.choice(HOSTS), _message(rng)]
+
+def generate_log(log_format, size_bytes, seed=42):
+    """Text of a synthetic log in the given format, about size_bytes long"""
+    rng = random.Random(f"{log_format}:{seed}")
+    parts = []
+    size = 0
+    if log_format == 'json':
+        # An array of pretty-printed events, the shape Splunk exports use
+        events = json_events(rng)
+        parts.append("[\n")
+        while size < size_bytes:
+            event = json.dumps(next(events), indent=2)
+            parts.append(("  " if not size else ",\n  ") + event.replace("\n", "\n  "))
+            size += len(event) + 4
+        parts.append("\n]\n")
+        return "".join(parts)
+
+    if log_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(['timestamp', 'level', 'host', 'message'])
+        rows = csv_rows(rng)
+        while buffer.tell() < size_bytes:
+            writer.writerow(next(rows))
+        return buffer.getvalue()
+
+    lines = {'text': text_lines, 'cisco': cisco_lines, 'polycom': polycom_lines}[log_format](rng)
+    while size < size_bytes:
+        line = next(lines)
+        parts.append(line)
+        size += len(line) + 1
+    return "\n".join(parts) + "\n"
+
+def write_log(log_format, size_bytes, directory, seed=42):
+    """Write a synthetic log to directory and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{log_format}_{seed}{EXTENSIONS[log_format]}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_log(log_format, size_bytes, seed))
+    return path
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--size-mb', type=float, default=10)
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--formats', default=",".join(FORMATS))
+    arg_parser.add_argument('--output-dir', default='synthetic_logs')
+    args = arg_parser.parse_args()
+
+    for log_format in args.formats.split(','):
+        path = write_log(log_format, int(args.size_mb * 1024 * 1024), args.output_dir, args.seed)
+        print(f"{log_format:<8} {os.path.getsize(path) / (1024 * 1024):8.1f}MB  {path}")
+
+if __name__ == '__main__':
+    main()
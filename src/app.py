@@ -1,18 +1,29 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from markupsafe import escape
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from parser import parse_log
-from llm import analyze_incident, validate_llm_connection, parse_analysis_output
-from utils import save_uploaded_file
+from parser import stream_log
+from records import render_records
+from llm import analyze_incident, validate_llm_connection, parse_analysis_output, ANALYSIS_MODES, client as llm_client
+from utils import store_upload
+from batch import analyze_batch, run_batch, is_archive, BATCH_MAX_FILES
+from timeindex import parse_window, windowed_log, EmptyWindowError
+from correlate import LogSource, merge_timelines, unique_source_name, CORRELATE_MAX_FILES
+from lineindex import severity_log, at_least, parse_min_level
 from system_monitor import monitor
+from cache import analysis_cache
+from jobs import job_manager, JobQueueFull
+from metrics import registry, stage_seconds, rejections
 import os
+import json
 import threading
 import time
 import logging
 import secrets
+import uuid
 from functools import wraps
 from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 
 # Configure secure logging
 logging.basicConfig(
@@ -41,8 +52,25 @@ limiter = Limiter(
     default_limits=["200 per day", "50 per hour"]
 )
 
-# Global variables for progress tracking
-progress_data = {'percent': 0, 'message': 'Ready', 'processing': False}
+# Raw log lines shown on the results page
+MAX_DISPLAY_LINES = 1000
+
+# Load the LLM SDK and start system sampling in the background when the app is started
+PREWARM = os.getenv("PREWARM", "true").lower() == "true"
+prewarm_lock = threading.Lock()
+prewarm_started = False  # The background pre-warm runs once per process
+
+# Batch uploads and their JSONL results
+BATCH_FOLDER = os.path.join('data', 'batches')
+
+# Demo buttons: form field -> (sample log, display name, audit description)
+DEMO_LOGS = {
+    'demo_basic': ('../data/sample_incident.log', "Basic Log Format", "Basic log demo used"),
+    'demo_splunk': ('../data/sample_splunk.json', "Splunk JSON Format", "Splunk demo used"),
+    'demo_complex': ('../data/sample_complex.txt', "Complex System Log", "Complex demo used"),
+    'demo_cisco': ('../data/sample_cisco.log', "Cisco Network Log", "Cisco demo used"),
+    'demo_polycom': ('../data/sample_polycom.log', "Polycom VoIP Log", "Polycom demo used"),
+}
 
 def security_headers(response):
     """Add security headers to all responses"""
@@ -70,18 +98,151 @@ def validate_input(data, max_length=1000):
     # Basic XSS prevention - escape HTML
     return escape(data_str)
 
-def progress_callback(percent, message):
-    """Callback function for progress updates"""
-    global progress_data
-    # Sanitize progress message
-    safe_message = validate_input(message, 200)
-    progress_data = {'percent': percent, 'message': safe_message, 'processing': percent < 100}
+def progress_message(message):
+    """Sanitize progress messages before they are stored on a job"""
+    return validate_input(message, 200)
+
+def analyze_log_file(filepath, mode=None, progress_callback=None, token_callback=None, log_format=None,
+                     window=None, min_level=None):
+    """Stream a log file (or only a time window or severity slice of it) into the analyzer"""
+    if window:
+        if progress_callback:
+            progress_callback(5, f"Locating {window.describe()}...")
+        records = windowed_log(filepath, window, log_format, min_level)
+    elif min_level:
+        records = severity_log(filepath, min_level, log_format)
+    else:
+        records = stream_log(filepath, log_format)
+    return analyze_records(records, mode, progress_callback, token_callback)
+
+def analyze_log_files(sources, mode=None, progress_callback=None, token_callback=None, min_level=None):
+    """Analyze several logs as one timeline, merged by timestamp and tagged with each log's name"""
+    if progress_callback:
+        progress_callback(5, f"Merging {len(sources)} logs into one timeline...")
+    records = merge_timelines(sources)
+    if min_level:
+        records = at_least(records, min_level)
+    return analyze_records(records, mode, progress_callback, token_callback)
+
+def analyze_records(records, mode=None, progress_callback=None, token_callback=None):
+    """Stream records into the analyzer, keeping the first lines it consumed for display"""
+    consumed = []
+    skipped = 0
+    
+    def capture(records):
+        nonlocal skipped
+        for record in records:
+            if len(consumed) < MAX_DISPLAY_LINES:
+                consumed.append(record)
+            else:
+                skipped += 1
+            yield record
+    
+    analysis = analyze_incident(capture(records), progress_callback, mode, token_callback)
+    raw_log_data = "\n".join(render_records(consumed))
+    if skipped:
+        raw_log_data += f"\n... {skipped} more lines not shown"
+    return raw_log_data, analysis
+
+def analysis_job(filepath, demo_type, mode, ip_address, log_format=None, window=None, sources=None,
+                 min_level=None):
+    """Build the background work for one analysis (or one merged timeline of sources); runs on a job worker thread"""
+    def work(progress_callback, token_callback):
+        try:
+            if sources:
+                raw_log_data, analysis = analyze_log_files(sources, mode, progress_callback, token_callback,
+                                                           min_level)
+            else:
+                raw_log_data, analysis = analyze_log_file(filepath, mode, progress_callback, token_callback,
+                                                          log_format, window, min_level)
+        except EmptyWindowError as e:
+            progress_callback(100, "Error: no log lines in the requested time window")
+            raw_log_data, analysis = "", f"Time Window Error: {str(e)}"
+        except Exception as e:
+            log_security_event("ANALYSIS_ERROR", f"Analysis failed: {type(e).__name__}", ip_address)
+            raise
+        
+        # Parse the analysis output into structured components
+        parsed_analysis = None
+        if analysis:
+            parsed_analysis = parse_analysis_output(analysis)
+        
+        return {
+            'analysis': analysis,
+            'parsed_analysis': parsed_analysis,
+            'raw_log_data': raw_log_data,
+            'demo_type': demo_type
+        }
+    return work
+
+def batch_job(inputs, output_path, mode, ip_address, names=None):
+    """Build the background work for a batch: an archive to extract or a list of saved files"""
+    def work(progress_callback, token_callback):
+        try:
+            if isinstance(inputs, str):
+                return analyze_batch(inputs, output_path, mode, progress_callback=progress_callback)
+            return run_batch(inputs, output_path, mode, progress_callback=progress_callback, names=names)
+        except Exception as e:
+            log_security_event("BATCH_ERROR", f"Batch failed: {type(e).__name__}", ip_address)
+            raise
+    return work
+
+def collect_component_metrics():
+    """Scrape-time metrics from the system monitor, result cache, job queue and LLM backends"""
+    sample = monitor.latest()
+    system, process = sample['system'], sample['process']
+    for name in ('cpu_percent', 'memory_percent', 'memory_used_mb', 'disk_usage_percent'):
+        yield f"system_{name}", 'gauge', f"Host {name.replace('_', ' ')} (sampled)", [({}, system.get(name))]
+    for name in ('cpu_percent', 'memory_mb', 'threads'):
+        yield f"process_{name}", 'gauge', f"App process {name.replace('_', ' ')} (sampled)", [({}, process.get(name))]
+    
+    cache = analysis_cache.stats()
+    yield "cache_lookups_total", 'counter', "Analysis cache lookups by result", [
+        ({'result': 'hit'}, cache['hits']), ({'result': 'disk_hit'}, cache['disk_hits']),
+        ({'result': 'miss'}, cache['misses'])]
+    yield "cache_entries", 'gauge', "Analyses held in the in-memory cache", [({}, cache['entries'])]
+    
+    jobs = job_manager.stats()
+    yield "jobs", 'gauge', "Retained analysis jobs by status", [
+        ({'status': status}, jobs[status]) for status in ('queued', 'running', 'completed', 'failed')]
+    
+    llm = llm_client.stats()
+    backends = llm['backends']
+    yield "llm_backend_healthy", 'gauge', "Backend is healthy and its circuit is not open", [
+        ({'backend': b['url']}, b['healthy'] and b['breaker_state'] != 'open') for b in backends]
+    yield "llm_in_flight", 'gauge', "LLM calls in flight", [({'backend': b['url']}, b['in_flight']) for b in backends]
+    yield "llm_requests_total", 'counter', "LLM calls routed to each backend", [
+        ({'backend': b['url']}, b['requests']) for b in backends]
+    yield "llm_failures_total", 'counter', "Failed LLM calls per backend", [
+        ({'backend': b['url']}, b['failures']) for b in backends]
+    yield "llm_retries_total", 'counter', "LLM call retries per backend", [
+        ({'backend': b['url']}, b['retries']) for b in backends]
+
+registry.register_collector(collect_component_metrics)
+
+def wants_json():
+    """True when the client asked for a JSON response rather than the results page"""
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def render_job_result(job):
+    """Render a finished job on the results page"""
+    if job.status == 'failed':
+        return render_template('index.html',
+                             error="Analysis failed. Please check your file format and try again.",
+                             system_stats=monitor.get_current_stats(),
+                             process_info=monitor.get_process_info())
+    
+    return render_template('index.html',
+                         system_stats=monitor.get_current_stats(),
+                         process_info=monitor.get_process_info(),
+                         **job.result)
 
 @app.errorhandler(413)
 @app.errorhandler(RequestEntityTooLarge)
 def handle_file_too_large(e):
     """Handle file upload size limit exceeded"""
     log_security_event("FILE_TOO_LARGE", "File upload exceeded size limit", request.remote_addr)
+    rejections.inc(reason='too_large')
     return render_template('index.html',
                          error="File too large. Maximum size allowed is 10MB.",
                          system_stats=monitor.get_current_stats(),
@@ -91,6 +252,7 @@ def handle_file_too_large(e):
 def handle_rate_limit(e):
     """Handle rate limit exceeded"""
     log_security_event("RATE_LIMIT_EXCEEDED", str(e), request.remote_addr)
+    rejections.inc(reason='rate_limited')
     return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
 
 @app.errorhandler(Exception)
@@ -124,109 +286,260 @@ def home():
 @app.route('/analyze', methods=['POST'])
 @limiter.limit("10 per minute")
 def analyze():
-    global progress_data
-    analysis = None
-    raw_log_data = None
+    """Queue an analysis and return its job ID; plain form posts wait for the result page"""
+    filepath = None
     demo_type = None
+    log_format = None
+    sources = None
     
-    # Reset progress
-    progress_data = {'percent': 0, 'message': 'Starting analysis...', 'processing': True}
+    # How to handle logs too large for one LLM pass (server default when not given)
+    analysis_mode = request.form.get('analysis_mode')
+    if analysis_mode not in ANALYSIS_MODES:
+        analysis_mode = None
     
+    # Optional slices: ±N minutes around a time or N minutes before the first CRITICAL, and a minimum severity
     try:
-        if 'demo_basic' in request.form:
-            # Use basic incident log for demo
-            sample_log_path = '../data/sample_incident.log'
-            raw_log_data = parse_log(sample_log_path)
-            analysis = analyze_incident(raw_log_data, progress_callback)
-            demo_type = "Basic Log Format"
-            log_security_event("DEMO_ANALYSIS", "Basic log demo used", request.remote_addr)
-            
-        elif 'demo_splunk' in request.form:
-            # Use Splunk JSON format for demo
-            sample_log_path = '../data/sample_splunk.json'
-            raw_log_data = parse_log(sample_log_path)
-            analysis = analyze_incident(raw_log_data, progress_callback)
-            demo_type = "Splunk JSON Format"
-            log_security_event("DEMO_ANALYSIS", "Splunk demo used", request.remote_addr)
-            
-        elif 'demo_complex' in request.form:
-            # Use complex system log for demo
-            sample_log_path = '../data/sample_complex.txt'
-            raw_log_data = parse_log(sample_log_path)
-            analysis = analyze_incident(raw_log_data, progress_callback)
-            demo_type = "Complex System Log"
-            log_security_event("DEMO_ANALYSIS", "Complex demo used", request.remote_addr)
-            
-        elif 'demo_cisco' in request.form:
-            # Use Cisco log format for demo
-            sample_log_path = '../data/sample_cisco.log'
-            raw_log_data = parse_log(sample_log_path)
-            analysis = analyze_incident(raw_log_data, progress_callback)
-            demo_type = "Cisco Network Log"
-            log_security_event("DEMO_ANALYSIS", "Cisco demo used", request.remote_addr)
-            
-        elif 'demo_polycom' in request.form:
-            # Use Polycom log format for demo
-            sample_log_path = '../data/sample_polycom.log'
-            raw_log_data = parse_log(sample_log_path)
-            analysis = analyze_incident(raw_log_data, progress_callback)
-            demo_type = "Polycom VoIP Log"
-            log_security_event("DEMO_ANALYSIS", "Polycom demo used", request.remote_addr)
-            
-        elif 'incident_file' in request.files:
-            uploaded_file = request.files['incident_file']
-            if uploaded_file.filename:
-                try:
-                    # Secure file upload with validation
-                    filepath = save_uploaded_file(uploaded_file)
-                    raw_log_data = parse_log(filepath)
-                    analysis = analyze_incident(raw_log_data, progress_callback)
+        window = parse_window(request.form.get('window_around'), request.form.get('window_minutes'),
+                              request.form.get('window_before_critical'))
+        min_level = parse_min_level(request.form.get('min_level'))
+    except ValueError as ve:
+        rejections.inc(reason='window_validation')
+        if wants_json():
+            return jsonify({'error': f"Invalid analysis filter: {str(ve)}"}), 400
+        return render_template('index.html',
+                             error=f"Invalid analysis filter: {str(ve)}",
+                             system_stats=monitor.get_current_stats(),
+                             process_info=monitor.get_process_info())
+    
+    demo = next((field for field in DEMO_LOGS if field in request.form), None)
+    if demo:
+        filepath, demo_type, description = DEMO_LOGS[demo]
+        log_security_event("DEMO_ANALYSIS", description, request.remote_addr)
+        
+    elif 'incident_file' in request.files:
+        # Several files are analyzed together as one timeline merged by timestamp
+        uploaded_files = [f for f in request.files.getlist('incident_file') if f.filename]
+        if uploaded_files:
+            try:
+                if len(uploaded_files) > CORRELATE_MAX_FILES:
+                    raise ValueError(f"At most {CORRELATE_MAX_FILES} files can be analyzed together")
+                if len(uploaded_files) > 1 and window:
+                    raise ValueError("Time windows apply to single-file analyses")
+                
+                uploads = []
+                safe_filenames = []
+                for uploaded_file in uploaded_files:
+                    # Secure file upload: streamed to disk while hashing, size-checking and sniffing the format
+                    with stage_seconds.time(stage='upload_save'):
+                        upload = store_upload(uploaded_file)
+                    uploads.append((uploaded_file.filename, upload))
                     
                     # Sanitize filename for display
                     safe_filename = validate_input(uploaded_file.filename, 100)
-                    demo_type = f"Uploaded File: {safe_filename}"
+                    safe_filenames.append(safe_filename)
                     
-                    log_security_event("FILE_UPLOAD", f"File uploaded: {safe_filename}", request.remote_addr)
-                    
-                except ValueError as ve:
-                    # Security validation failed
-                    log_security_event("FILE_UPLOAD_REJECTED", str(ve), request.remote_addr)
-                    progress_data = {'percent': 100, 'message': 'Upload rejected', 'processing': False}
-                    return render_template('index.html',
-                                         error=f"File upload failed: {str(ve)}",
-                                         system_stats=monitor.get_current_stats(),
-                                         process_info=monitor.get_process_info())
+                    details = f"File uploaded: {safe_filename} (sha256 {upload.sha256[:16]}"
+                    details += ", duplicate of a stored upload)" if upload.duplicate else ")"
+                    log_security_event("FILE_UPLOAD", details, request.remote_addr)
+                
+                if len(uploads) == 1:
+                    filepath = uploads[0][1].path
+                    log_format = uploads[0][1].log_format
+                    demo_type = f"Uploaded File: {safe_filenames[0]}"
+                else:
+                    taken = set()
+                    sources = [LogSource(unique_source_name(secure_filename(name) or 'log', taken), upload.path,
+                                         upload.log_format)
+                               for name, upload in uploads]
+                    demo_type = f"Correlated Files: {', '.join(safe_filenames)}"
+                
+            except ValueError as ve:
+                # Security validation failed
+                log_security_event("FILE_UPLOAD_REJECTED", str(ve), request.remote_addr)
+                rejections.inc(reason='upload_validation')
+                if wants_json():
+                    return jsonify({'error': f"File upload failed: {str(ve)}"}), 400
+                return render_template('index.html',
+                                     error=f"File upload failed: {str(ve)}",
+                                     system_stats=monitor.get_current_stats(),
+                                     process_info=monitor.get_process_info())
     
-        # Parse the analysis output into structured components
-        parsed_analysis = None
-        if analysis:
-            parsed_analysis = parse_analysis_output(analysis)
-        
-        # Get updated system stats after processing
-        system_stats = monitor.get_current_stats()
-        process_info = monitor.get_process_info()
-        
+    if filepath is None and not sources:
+        if wants_json():
+            return jsonify({'error': 'No log file or demo selected'}), 400
         return render_template('index.html',
-                             analysis=analysis,
-                             parsed_analysis=parsed_analysis,
-                             raw_log_data=raw_log_data,
-                             demo_type=demo_type,
-                             system_stats=system_stats,
-                             process_info=process_info)
+                             system_stats=monitor.get_current_stats(),
+                             process_info=monitor.get_process_info())
     
-    except Exception as e:
-        log_security_event("ANALYSIS_ERROR", f"Analysis failed: {type(e).__name__}", request.remote_addr)
-        progress_data = {'percent': 100, 'message': 'Analysis failed', 'processing': False}
+    if window:
+        demo_type = f"{demo_type} ({escape(window.describe())})"
+    if min_level:
+        demo_type = f"{demo_type} ({min_level.name} and above)"
+    
+    try:
+        job = job_manager.submit(analysis_job(filepath, demo_type, analysis_mode, request.remote_addr, log_format,
+                                              window, sources, min_level),
+                                 progress_message)
+    except JobQueueFull as e:
+        # Backpressure: tell the client to retry instead of queueing without bound
+        log_security_event("ANALYSIS_QUEUE_FULL", str(e), request.remote_addr)
+        rejections.inc(reason='queue_full')
+        if wants_json():
+            return jsonify({'error': 'Analysis queue is full. Please try again shortly.'}), 503, {'Retry-After': '30'}
         return render_template('index.html',
-                             error="Analysis failed. Please check your file format and try again.",
+                             error="The server is busy with other analyses. Please try again shortly.",
                              system_stats=monitor.get_current_stats(),
-                             process_info=monitor.get_process_info())
+                             process_info=monitor.get_process_info()), 503
+    
+    if wants_json():
+        return jsonify({
+            'job_id': job.id,
+            'progress_url': f"/progress/{job.id}",
+            'stream_url': f"/stream/{job.id}",
+            'result_url': f"/result/{job.id}"
+        }), 202
+    
+    # Browsers without JavaScript post the form directly and wait for the page
+    job.done.wait()
+    return render_job_result(job)
+
+@app.route('/batch', methods=['POST'])
+@limiter.limit("5 per minute")
+def batch():
+    """Queue a batch analysis of an archive ('archive') or several log files ('files')"""
+    analysis_mode = request.form.get('analysis_mode')
+    if analysis_mode not in ANALYSIS_MODES:
+        analysis_mode = None
+    
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(BATCH_FOLDER, batch_id)
+    archive = request.files.get('archive')
+    uploads = [f for f in request.files.getlist('files') if f.filename]
+    names = {}
+    
+    try:
+        if archive and archive.filename:
+            if not is_archive(archive.filename):
+                raise ValueError("Archive must be .zip, .tar, .tar.gz or .tgz")
+            filename = secure_filename(archive.filename)
+            if not filename:
+                raise ValueError("Invalid filename after security processing")
+            os.makedirs(batch_dir, exist_ok=True)
+            inputs = os.path.join(batch_dir, filename)
+            archive.save(inputs)
+            description = f"Batch archive uploaded: {validate_input(archive.filename, 100)}"
+        elif uploads:
+            if len(uploads) > BATCH_MAX_FILES:
+                raise ValueError(f"At most {BATCH_MAX_FILES} files per batch")
+            # Identical files are stored once and analyzed once, reported under the first name
+            for uploaded_file in uploads:
+                names.setdefault(store_upload(uploaded_file, batch_dir).path, secure_filename(uploaded_file.filename))
+            inputs = list(names)
+            description = f"Batch of {len(uploads)} files uploaded ({len(inputs)} distinct)"
+        else:
+            return jsonify({'error': 'No archive or log files provided'}), 400
+    except ValueError as ve:
+        log_security_event("BATCH_UPLOAD_REJECTED", str(ve), request.remote_addr)
+        rejections.inc(reason='upload_validation')
+        return jsonify({'error': f"Batch upload failed: {str(ve)}"}), 400
+    
+    log_security_event("BATCH_UPLOAD", description, request.remote_addr)
+    output_path = os.path.join(batch_dir, 'results.jsonl')
+    try:
+        job = job_manager.submit(batch_job(inputs, output_path, analysis_mode, request.remote_addr, names),
+                                 progress_message)
+    except JobQueueFull as e:
+        log_security_event("ANALYSIS_QUEUE_FULL", str(e), request.remote_addr)
+        rejections.inc(reason='queue_full')
+        return jsonify({'error': 'Analysis queue is full. Please try again shortly.'}), 503, {'Retry-After': '30'}
+    
+    return jsonify({
+        'job_id': job.id,
+        'progress_url': f"/progress/{job.id}",
+        'result_url': f"/result/{job.id}?format=json",
+        'results_url': f"/batch/{job.id}/results"
+    }), 202
+
+@app.route('/batch/<job_id>/results')
+@limiter.limit("30 per minute")
+def get_batch_results(job_id):
+    """JSONL results of a finished batch, one line per log file"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if not job.done.is_set():
+        return jsonify(job.progress()), 202
+    if job.status == 'failed' or not isinstance(job.result, dict) or 'output' not in job.result:
+        return jsonify({'job_id': job.id, 'status': job.status,
+                        'error': 'Batch failed. Please check the uploaded files and try again.'})
+    
+    def lines():
+        with open(job.result['output'], encoding='utf-8') as f:
+            for line in f:
+                yield line
+    
+    return Response(lines(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': f"attachment; filename=batch-{job.id}.jsonl"})
 
 @app.route('/progress')
 @limiter.limit("60 per minute")
 def get_progress():
-    """API endpoint for progress updates"""
-    return jsonify(progress_data)
+    """API endpoint for progress updates of the most recent job"""
+    job = job_manager.latest()
+    if job is None:
+        return jsonify({'percent': 0, 'message': 'Ready', 'processing': False})
+    # Anyone can poll this endpoint, so it never reveals the id of a job the caller did not submit
+    return jsonify(job.progress(include_id=False))
+
+@app.route('/progress/<job_id>')
+@limiter.limit("150 per minute")
+def get_job_progress(job_id):
+    """API endpoint for progress updates of one job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.progress())
+
+@app.route('/stream/<job_id>')
+@limiter.limit("30 per minute")
+def stream_job(job_id):
+    """Server-Sent Events stream of a job's progress and LLM output as it is generated"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    def events():
+        for event, data in job.updates():
+            if event == 'keepalive':
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/result/<job_id>')
+@limiter.limit("30 per minute")
+def get_job_result(job_id):
+    """Results page for a finished job, or JSON with ?format=json"""
+    job = job_manager.get(job_id)
+    as_json = request.args.get('format') == 'json'
+    if job is None:
+        if as_json:
+            return jsonify({'error': 'Unknown or expired job'}), 404
+        return render_template('index.html',
+                             error="This analysis has expired or does not exist.",
+                             system_stats=monitor.get_current_stats(),
+                             process_info=monitor.get_process_info()), 404
+    
+    if not job.done.is_set():
+        return jsonify(job.progress()), 202
+    if not as_json:
+        return render_job_result(job)
+    if job.status == 'failed':
+        return jsonify({'job_id': job.id, 'status': job.status,
+                        'error': 'Analysis failed. Please check your file format and try again.'})
+    return jsonify(dict(job.result, job_id=job.id, status=job.status))
 
 @app.route('/system_stats')
 @limiter.limit("60 per minute")
@@ -235,12 +548,30 @@ def get_system_stats():
     try:
         return jsonify({
             'system': monitor.get_current_stats(),
-            'process': monitor.get_process_info()
+            'process': monitor.get_process_info(),
+            'cache': analysis_cache.stats(),
+            'jobs': job_manager.stats(),
+            'llm': llm_client.stats()
         })
     except Exception as e:
         log_security_event("SYSTEM_STATS_ERROR", str(e), request.remote_addr)
         return jsonify({'error': 'Unable to retrieve system statistics'}), 500
 
+@app.route('/system_stats/history')
+@limiter.limit("60 per minute")
+def get_system_stats_history():
+    """Min/max/avg of sampled system and process stats over the last N minutes"""
+    minutes = request.args.get('minutes', default=5, type=float)
+    if minutes is None or minutes <= 0:
+        return jsonify({'error': 'minutes must be a positive number'}), 400
+    return jsonify(monitor.get_history(minutes))
+
+@app.route('/metrics')
+@limiter.limit("120 per minute")
+def get_metrics():
+    """Prometheus text exposition of pipeline stage latencies, counters and component stats"""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/validate_llm')
 @limiter.limit("5 per minute")
 def validate_llm():
@@ -253,6 +584,21 @@ def validate_llm():
         log_security_event("LLM_VALIDATION_ERROR", str(e), request.remote_addr)
         return jsonify({'error': 'LLM validation failed', 'status': 'error'}), 500
 
+def prewarm():
+    """Load the lazily imported LLM client and system monitor ahead of the first request"""
+    with stage_seconds.time(stage='prewarm'):
+        llm_client.warm()
+        monitor.start()
+
+def prewarm_app(warm=PREWARM):
+    """The app, for WSGI servers (gunicorn 'app:prewarm_app()'), pre-warming it in the background once"""
+    global prewarm_started
+    with prewarm_lock:
+        if warm and not prewarm_started:
+            prewarm_started = True
+            threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+    return app
+
 if __name__ == '__main__':
     # Disable debug mode for production security
-    app.run(debug=False, host='127.0.0.1', port=5000)
\ No newline at end of file
+    prewarm_app().run(debug=False, host='127.0.0.1', port=5000)
\ No newline at end of file
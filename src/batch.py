@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.utils import secure_filename
+from utils import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from compression import is_log_name, open_log_members
+
+# Batch configuration
+BATCH_PARSE_WORKERS = int(os.getenv("BATCH_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))  # Parser processes
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))  # Analyses sent to the model servers at once
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))  # Log files accepted per batch
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# Analysis results that are error reports rather than an RCA
+ANALYSIS_ERROR_PREFIXES = ("Error analyzing incident", "Security Error")
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def _copy_member(blocks, target_dir, name, seen):
+    """Write one archive member to the batch directory, refusing oversized members"""
+    filename = secure_filename(os.path.basename(name))
+    if not filename:
+        return None
+    # Different folders in an archive may hold files with the same name
+    base, ext = os.path.splitext(filename)
+    count = seen.get(filename, 0)
+    seen[filename] = count + 1
+    if count:
+        filename = f"{base}_{count}{ext}"
+
+    target = os.path.join(target_dir, filename)
+    copied = 0
+    with open(target, 'wb') as out:
+        for block in blocks:
+            copied += len(block)
+            if copied > MAX_FILE_SIZE:
+                raise ValueError(f"Archive member {name} exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB")
+            out.write(block)
+    return target
+
+def extract_archive(archive, target_dir, max_files=BATCH_MAX_FILES):
+    """Extract the log files of a zip or tar archive (flattened, names sanitized)
+
+    Members are inflated under the same size, ratio and entry-count limits as compressed uploads.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    paths = []
+    seen = {}
+    for name, blocks in open_log_members(archive):
+        if len(paths) >= max_files:
+            raise ValueError(f"Archive contains more than {max_files} log files")
+        path = _copy_member(blocks, target_dir, name, seen)
+        if path:
+            paths.append(path)
+    return paths
+
+def collect_inputs(path, workdir, max_files=BATCH_MAX_FILES):
+    """Log files to analyze from a directory, an archive or a single file"""
+    if os.path.isdir(path):
+        paths = []
+        for root, _, files in os.walk(path):
+            paths.extend(os.path.join(root, name) for name in files if is_log_name(name))
+        paths.sort()
+        if len(paths) > max_files:
+            raise ValueError(f"Directory contains more than {max_files} log files")
+        return paths
+    if is_archive(path):
+        return extract_archive(path, workdir, max_files)
+    if is_log_name(path):
+        return [path]
+    raise ValueError(f"Unsupported batch input: {os.path.basename(path)}")
+
+def parse_file(path):
+    """Process pool step: detect the format and parse one file to text"""
+    from parser import parse_log, detect_log_format
+    start_time = time.time()
+    try:
+        size = os.path.getsize(path)
+        if size > MAX_FILE_SIZE:
+            raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)}MB")
+        log_format = detect_log_format(path)
+        return {
+            'format': log_format,
+            'size_bytes': size,
+            'text': parse_log(path, log_format),
+            'parse_time': round(time.time() - start_time, 3)
+        }
+    except Exception as e:
+        return {'error': f"Parse failed: {str(e)}", 'parse_time': round(time.time() - start_time, 3)}
+
+def display_name(path, root=None, names=None):
+    """File name reported in results: the uploaded name, else relative to the batch directory"""
+    if names and path in names:
+        return names[path]
+    return os.path.relpath(path, root) if root else os.path.basename(path)
+
+def analyze_parsed(path, parsed, mode=None, root=None, names=None):
+    """Thread pool step: run the LLM analysis for one parsed file and build its result line"""
+    from llm import analyze_incident, parse_analysis_output
+    result = {'file': display_name(path, root, names)}
+    result.update({key: value for key, value in parsed.items() if key != 'text'})
+    if 'error' in parsed:
+        result['status'] = 'error'
+        return result
+
+    start_time = time.time()
+    analysis = analyze_incident(parsed['text'], mode=mode)
+    result['analysis_time'] = round(time.time() - start_time, 2)
+    result['lines'] = parsed['text'].count('\n') + 1 if parsed['text'] else 0
+
+    if analysis.startswith(ANALYSIS_ERROR_PREFIXES):
+        result['status'] = 'error'
+        result['error'] = analysis
+        return result
+
+    result['status'] = 'ok'
+    sections = parse_analysis_output(analysis)
+    result['analysis'] = sections.pop('raw_output')
+    result.update(sections)
+    return result
+
+def run_batch(paths, output_path, mode=None, workers=BATCH_PARSE_WORKERS, concurrency=BATCH_LLM_CONCURRENCY,
+              progress_callback=None, root=None, names=None):
+    """Parse files in worker processes and analyze them concurrently, writing one JSON line per file"""
+    start_time = time.time()
+    total = len(paths)
+    summary = {'files': total, 'succeeded': 0, 'failed': 0, 'output': output_path}
+    pending_paths = iter(paths)
+    # Parsed text waiting for the LLM is bounded, so large batches do not pile up in memory
+    max_in_flight = workers + concurrency * 2
+
+    # Spawned workers: forking a process that runs request and job threads is not safe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as parse_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as llm_pool, \
+            open(output_path, 'w', encoding='utf-8') as out:
+        parsing = {}
+        analyzing = {}
+        while True:
+            while len(parsing) + len(analyzing) < max_in_flight:
+                path = next(pending_paths, None)
+                if path is None:
+                    break
+                try:
+                    parsing[parse_pool.submit(parse_file, path)] = path
+                except BrokenProcessPool as e:
+                    # The pool is gone once a worker died; the remaining files are reported as failed
+                    parsed = {'error': f"Parse failed: {str(e)}"}
+                    analyzing[llm_pool.submit(analyze_parsed, path, parsed, mode, root, names)] = path
+            if not parsing and not analyzing:
+                break
+
+            done, _ = wait(list(parsing) + list(analyzing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in parsing:
+                    path = parsing.pop(future)
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        # A crashed or killed parser process fails this file, not the batch
+                        parsed = {'error': f"Parse failed: {str(e)}"}
+                    analyzing[llm_pool.submit(analyze_parsed, path, parsed, mode, root, names)] = path
+                    continue
+
+                path = analyzing.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'file': display_name(path, root, names), 'status': 'error',
+                              'error': f"Analysis failed: {str(e)}"}
+                summary['succeeded' if result['status'] == 'ok' else 'failed'] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+
+                completed = summary['succeeded'] + summary['failed']
+                if progress_callback:
+                    progress_callback(int(completed / total * 100) if completed < total else 99,
+                                      f"Analyzed {completed} of {total} files...")
+
+    summary['elapsed_seconds'] = round(time.time() - start_time, 2)
+    if progress_callback:
+        progress_callback(100, f"Batch complete: {summary['succeeded']} analyzed, {summary['failed']} failed")
+    return summary
+
+def analyze_batch(source, output_path, mode=None, workers=BATCH_PARSE_WORKERS, concurrency=BATCH_LLM_CONCURRENCY,
+                  progress_callback=None):
+    """Analyze every log in a directory or archive, writing results to a JSONL file"""
+    workdir = tempfile.mkdtemp(prefix='causewise-batch-')
+    try:
+        paths = collect_inputs(source, workdir)
+        if not paths:
+            raise ValueError("No log files found (allowed: " + ", ".join(sorted(ALLOWED_EXTENSIONS)) + ")")
+        root = source if os.path.isdir(source) else os.path.dirname(paths[0])
+        return run_batch(paths, output_path, mode, workers, concurrency, progress_callback, root)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Batch analysis of many incident logs: parse in a process pool, analyze with bounded LLM concurrency"
+    )
+    parser.add_argument('source', help='Directory, .zip/.tar archive or single log file')
+    parser.add_argument('-o', '--output', default='batch_results.jsonl', help='JSONL file to write results to')
+    parser.add_argument('--mode', choices=('reduce', 'map_reduce'), help='Large log handling (default: ANALYSIS_MODE)')
+    parser.add_argument('--workers', type=int, default=BATCH_PARSE_WORKERS, help='Parser processes')
+    parser.add_argument('--concurrency', type=int, default=BATCH_LLM_CONCURRENCY, help='Concurrent LLM analyses')
+    args = parser.parse_args()
+
+    def report(percent, message):
+        print(f"[{percent:3d}%] {message}", file=sys.stderr)
+
+    try:
+        summary = analyze_batch(args.source, args.output, args.mode, args.workers, args.concurrency, report)
+    except ValueError as e:
+        print(f"Batch failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0 if not summary['failed'] else 2
+
+if __name__ == '__main__':
+    sys.exit(main())
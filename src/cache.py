@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_SIZE", "128"))  # In-memory LRU entries
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))  # Entries expire after a day
+CACHE_DB_PATH = os.getenv("ANALYSIS_CACHE_DB", "")  # Optional SQLite file for the on-disk tier
+CACHE_DB_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_DB_SIZE", "2000"))
+
+def cache_key(*parts):
+    """Content-addressed key: SHA-256 over the parts that determine an analysis result"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8', errors='ignore'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """Two-tier result cache: in-memory LRU with an optional SQLite tier, both with TTL"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS,
+                 db_path=CACHE_DB_PATH, db_max_entries=CACHE_DB_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.db_max_entries = db_max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+        if self.db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                with self._connect() as db:
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS analysis_cache "
+                        "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+                    )
+            except sqlite3.Error:
+                # The disk tier is optional - fall back to memory only
+                self.db_path = ''
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation, so worker threads never share one"""
+        db = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        """Return the cached value for a key, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return value
+                del self.entries[key]
+                self.counters['expired'] += 1
+
+        value = self._disk_get(key, now)
+        with self.lock:
+            if value is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            self._remember(key, value[0], value[1])
+        return value[0]
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under a key"""
+        now = time.time()
+        with self.lock:
+            self._remember(key, value, now)
+        self._disk_set(key, value, now)
+
+    def _remember(self, key, value, created):
+        self.entries[key] = (value, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _disk_get(self, key, now):
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT value, created FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl_seconds:
+                    db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    return None
+                db.execute("UPDATE analysis_cache SET accessed = ? WHERE key = ?", (now, key))
+                return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def _disk_set(self, key, value, now):
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                # Size and TTL eviction for the disk tier
+                db.execute("DELETE FROM analysis_cache WHERE created < ?", (now - self.ttl_seconds,))
+                db.execute(
+                    "DELETE FROM analysis_cache WHERE key IN "
+                    "(SELECT key FROM analysis_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.db_max_entries,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Hit/miss counters and current size, for the monitoring endpoint"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['disk_hits']) / lookups * 100, 1) if lookups else 0
+        stats['disk_tier'] = bool(self.db_path)
+        return stats
+
+# Global cache instance
+analysis_cache = AnalysisCache()
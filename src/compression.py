@@ -0,0 +1,124 @@
+import os
+import gzip
+import tarfile
+import zipfile
+
+# Raw log files; compressed logs wrap one of these (app.log.gz) or are archives of them
+LOG_EXTENSIONS = {'.log', '.txt', '.json', '.csv'}
+STREAM_COMPRESSION = {'.gz': 'gzip', '.zst': 'zstd'}
+ARCHIVE_SUFFIXES = (('.tar.gz', 'tar'), ('.tgz', 'tar'), ('.tar.zst', 'tar'), ('.tar', 'tar'), ('.zip', 'zip'))
+
+# Decompression bomb limits
+MAX_DECOMPRESSED_SIZE = int(os.getenv("MAX_DECOMPRESSED_MB", "200")) * 1024 * 1024  # Inflated bytes per upload
+MAX_COMPRESSION_RATIO = int(os.getenv("MAX_COMPRESSION_RATIO", "200"))  # Inflated bytes per compressed byte
+MAX_ARCHIVE_MEMBERS = int(os.getenv("MAX_ARCHIVE_MEMBERS", "1000"))  # Entries read from one archive
+RATIO_CHECK_FLOOR = 1024 * 1024  # Small files compress extremely well; the ratio applies beyond this
+
+class DecompressionLimitError(ValueError):
+    """Raised when a compressed upload inflates beyond the configured limits"""
+
+def compression_kind(filename):
+    """'zip', 'tar', 'gzip', 'zstd' or None for a raw file, from the file name"""
+    name = filename.lower()
+    for suffix, kind in ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return kind
+    return STREAM_COMPRESSION.get(os.path.splitext(name)[1])
+
+def log_name(filename):
+    """Name of the log inside a single compressed stream (app.log.gz -> app.log)"""
+    root, ext = os.path.splitext(filename)
+    return root if ext.lower() in STREAM_COMPRESSION else filename
+
+def is_log_name(filename):
+    """A raw log file, or one compressed as a single stream"""
+    return os.path.splitext(log_name(filename).lower())[1] in LOG_EXTENSIONS
+
+def is_archive_name(filename):
+    return compression_kind(filename) in ('zip', 'tar')
+
+def _zstd_reader(fileobj):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compressed logs need the optional zstandard package (pip install zstandard)")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+def _decompressed(fileobj, kind):
+    """Readable stream of the inflated content of a gzip or zstd stream"""
+    if kind == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj)
+    if kind == 'zstd':
+        return _zstd_reader(fileobj)
+    return fileobj
+
+class _InflationBudget:
+    """Total inflated bytes of one upload, checked against the size and ratio limits"""
+
+    def __init__(self, compressed_size, max_size=MAX_DECOMPRESSED_SIZE, max_ratio=MAX_COMPRESSION_RATIO):
+        self.limit = min(max_size, max(RATIO_CHECK_FLOOR, compressed_size * max_ratio))
+        self.max_size = max_size
+        self.inflated = 0
+
+    def add(self, size):
+        self.inflated += size
+        if self.inflated > self.limit:
+            reason = "size limit" if self.limit == self.max_size else "compression ratio limit"
+            raise DecompressionLimitError(
+                f"Decompressed content exceeds the {reason} ({self.limit // (1024 * 1024)}MB); "
+                f"only the first part was read"
+            )
+
+def _blocks(stream, budget, chunk_size):
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            return
+        budget.add(len(block))
+        yield block
+
+def _tar_members(filepath, budget, chunk_size):
+    with open(filepath, 'rb') as raw:
+        # Stream mode: members are inflated in order, without seeking or extracting to disk
+        if filepath.lower().endswith('.tar.zst'):
+            archive = tarfile.open(fileobj=_zstd_reader(raw), mode='r|')
+        else:
+            archive = tarfile.open(fileobj=raw, mode='r|*')
+        with archive:
+            for count, member in enumerate(archive, 1):
+                if count > MAX_ARCHIVE_MEMBERS:
+                    raise DecompressionLimitError(f"Archive has more than {MAX_ARCHIVE_MEMBERS} entries")
+                # Regular files only: links and devices are never followed
+                if not member.isfile() or not is_log_name(member.name):
+                    continue
+                source = _decompressed(archive.extractfile(member), compression_kind(member.name))
+                yield log_name(member.name), _blocks(source, budget, chunk_size)
+
+def _zip_members(filepath, budget, chunk_size):
+    with zipfile.ZipFile(filepath) as archive:
+        entries = archive.infolist()
+        if len(entries) > MAX_ARCHIVE_MEMBERS:
+            raise DecompressionLimitError(f"Archive has more than {MAX_ARCHIVE_MEMBERS} entries")
+        for info in entries:
+            if info.is_dir() or not is_log_name(info.filename):
+                continue
+            with archive.open(info) as member:
+                source = _decompressed(member, compression_kind(info.filename))
+                yield log_name(info.filename), _blocks(source, budget, chunk_size)
+
+def open_log_members(filepath, chunk_size=64 * 1024):
+    """Yield (log name, byte blocks) for the log in a gzip/zstd file or each log in a zip/tar archive
+
+    Content is inflated block by block as it is consumed; DecompressionLimitError stops a bomb.
+    """
+    kind = compression_kind(filepath)
+    budget = _InflationBudget(os.path.getsize(filepath))
+    if kind == 'tar':
+        yield from _tar_members(filepath, budget, chunk_size)
+    elif kind == 'zip':
+        yield from _zip_members(filepath, budget, chunk_size)
+    elif kind:
+        with open(filepath, 'rb') as raw:
+            yield log_name(filepath), _blocks(_decompressed(raw, kind), budget, chunk_size)
+    else:
+        raise ValueError(f"{os.path.basename(filepath)} is not a compressed log")
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import time
+import heapq
+from itertools import chain
+from operator import itemgetter
+from records import note_record
+from parser import stream_log, detect_log_format
+from timestamps import record_time, YEARLESS_YEAR
+
+# Correlation configuration
+CORRELATE_MAX_FILES = int(os.getenv("CORRELATE_MAX_FILES", "10"))  # Logs merged into one timeline
+PRIME_RECORDS = 1000  # Records read per log while looking for its first timestamp
+
+class LogSource:
+    """One log file taking part in a merged timeline"""
+    __slots__ = ('name', 'path', 'log_format')
+
+    def __init__(self, name, path, log_format=None):
+        self.name = name  # Tag shown on each of its lines
+        self.path = path
+        self.log_format = log_format
+
+def _prime(records):
+    """Read records up to the first timestamped one: (records read, its time, whether it had a year)"""
+    primed = []
+    for record in records:
+        primed.append(record)
+        moment, has_year = record_time(record)
+        if moment is not None or len(primed) >= PRIME_RECORDS:
+            return primed, moment, has_year
+    return primed, None, False
+
+def _timeline(name, records, default_year):
+    """(time, record) pairs of one log, each record tagged with the log's name
+
+    Lines without a timestamp (stack traces, wrapped messages) keep the time of the line before them,
+    so they stay attached to it in the merge.
+    """
+    latest = float('-inf')
+    for record in records:
+        record.origin = name
+        moment = record_time(record, default_year)[0]
+        if moment is not None:
+            latest = moment
+        yield latest, record
+
+def merge_timelines(sources):
+    """Records of several logs merged into one timeline by normalized timestamp
+
+    A streaming k-way heap merge: one pending record per log is held in memory, whatever the sizes.
+    Logs without years in their timestamps (syslog, Cisco) are placed in the year of the others.
+    """
+    streams = []
+    for source in sources:
+        records = stream_log(source.path, source.log_format)
+        primed, moment, has_year = _prime(records)
+        streams.append((source, chain(primed, records), moment, has_year))
+
+    years = [time.gmtime(moment).tm_year for _, _, moment, has_year in streams if has_year]
+    default_year = min(years) if years else YEARLESS_YEAR
+
+    described = []
+    for source, _, moment, has_year in streams:
+        log_format = source.log_format or detect_log_format(source.path)
+        detail = f"{source.name} ({log_format}"
+        if moment is None:
+            detail += ", no timestamps"
+        elif not has_year and years:
+            detail += f", year {default_year} assumed"
+        described.append(detail + ")")
+    yield note_record(f"[CORRELATED TIMELINE - {len(streams)} logs merged by timestamp: {', '.join(described)}]")
+
+    timelines = [_timeline(source.name, records, default_year) for source, records, _, _ in streams]
+    for _, record in heapq.merge(*timelines, key=itemgetter(0)):
+        yield record
+
+def unique_source_name(name, taken):
+    """Log name made unique among the names already used in one timeline"""
+    candidate = name
+    number = 1
+    while candidate in taken:
+        number += 1
+        candidate = f"{name}#{number}"
+    taken.add(candidate)
+    return candidate
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import time
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sections import SectionScanner
+
+# Job queue configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Analyses running at once
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "20"))  # Queued + running jobs before rejecting
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "900"))  # Keep finished jobs this long
+JOB_KEEPALIVE_SECONDS = 15  # Idle interval before an update stream sends a keepalive
+
+class JobQueueFull(Exception):
+    """Raised when the queue is at its configured depth"""
+
+class Job:
+    """State of one background analysis"""
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = 'queued'
+        self.percent = 0
+        self.message = 'Queued for analysis...'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.done = threading.Event()
+        self.output = []  # LLM output deltas, in the order they were streamed
+        self.sections = []  # Analysis sections, each added as soon as it closes in the streamed output
+        self.scanner = SectionScanner(self._section_closed)
+        self.changed = threading.Condition()
+
+    def progress(self, include_id=True):
+        """Progress snapshot in the shape the /progress endpoint has always returned, plus the job id and status"""
+        snapshot = {
+            'status': self.status,
+            'percent': self.percent,
+            'message': self.message,
+            'processing': not self.done.is_set()
+        }
+        if include_id:
+            snapshot['job_id'] = self.id
+        return snapshot
+
+    def set_progress(self, percent, message):
+        with self.changed:
+            self.percent = percent
+            self.message = message
+            self.changed.notify_all()
+
+    def append_output(self, delta):
+        """Record a streamed piece of LLM output and wake up any listeners"""
+        with self.changed:
+            self.output.append(delta)
+            self.scanner.feed(delta)
+            self.changed.notify_all()
+    
+    def _section_closed(self, name, text):
+        # Called by the scanner with the condition's lock held
+        self.sections.append({'name': name, 'text': text})
+    
+    def finish_output(self):
+        """Close the last section of the streamed output"""
+        with self.changed:
+            self.scanner.close()
+            self.changed.notify_all()
+
+    def updates(self, keepalive=JOB_KEEPALIVE_SECONDS):
+        """Yield ('progress' | 'token' | 'section' | 'done' | 'keepalive', data) events until the job finishes"""
+        sent = 0
+        sent_sections = 0
+        last_progress = None
+        while True:
+            with self.changed:
+                self.changed.wait_for(
+                    lambda: len(self.output) > sent or len(self.sections) > sent_sections
+                    or (self.percent, self.message) != last_progress or self.done.is_set(),
+                    timeout=keepalive
+                )
+                deltas = self.output[sent:]
+                sections = self.sections[sent_sections:]
+                progress = (self.percent, self.message)
+                finished = self.done.is_set()
+            
+            idle = True
+            if progress != last_progress:
+                last_progress = progress
+                idle = False
+                yield 'progress', self.progress()
+            if deltas:
+                sent += len(deltas)
+                idle = False
+                yield 'token', "".join(deltas)
+            for section in sections:
+                sent_sections += 1
+                idle = False
+                yield 'section', section
+            if finished:
+                yield 'done', self.progress()
+                return
+            if idle:
+                yield 'keepalive', None
+
+class JobManager:
+    """Bounded worker pool that runs analyses in the background with per-job progress"""
+
+    def __init__(self, workers=JOB_WORKERS, max_depth=JOB_QUEUE_DEPTH, retention=JOB_RETENTION_SECONDS):
+        self.max_depth = max_depth
+        self.retention = retention
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        self.jobs = {}
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def submit(self, work, message_filter=None):
+        """Queue work(progress_callback, token_callback) and return the job right away"""
+        with self.lock:
+            self._purge_finished()
+            if self.active >= self.max_depth:
+                raise JobQueueFull(f"Analysis queue is full ({self.max_depth} jobs)")
+            job = Job(secrets.token_urlsafe(16))
+            self.jobs[job.id] = job
+            self.active += 1
+
+        def progress_callback(percent, message):
+            job.set_progress(percent, message_filter(message) if message_filter else message)
+
+        def run():
+            job.status = 'running'
+            try:
+                job.result = work(progress_callback, job.append_output)
+                job.status = 'completed'
+            except Exception as e:
+                job.error = e
+                job.status = 'failed'
+            finally:
+                job.finish_output()
+                job.finished = time.time()
+                with self.lock:
+                    self.active -= 1
+                with job.changed:
+                    job.percent = 100
+                    job.done.set()
+                    job.changed.notify_all()
+
+        self.pool.submit(run)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def latest(self):
+        """Most recently submitted job, for the legacy id-less progress endpoint"""
+        with self.lock:
+            return next(reversed(self.jobs.values()), None)
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            'queued': statuses.count('queued'),
+            'running': statuses.count('running'),
+            'completed': statuses.count('completed'),
+            'failed': statuses.count('failed'),
+            'max_depth': self.max_depth
+        }
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+# Global job manager instance
+job_manager = JobManager()
@@ -0,0 +1,233 @@
+import os
+import sys
+import mmap
+import math
+import struct
+import hashlib
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import chain
+from records import Level, KIND_NOTE, note_record
+from parser import (
+    parse_text_logs, parse_cisco_logs, parse_polycom_logs, iter_lines, decode_chunks, detect_log_format, stream_log,
+    CHUNK_SIZE, MAX_LINE_LENGTH
+)
+from compression import compression_kind
+from metrics import stage_seconds
+from timestamps import record_time
+
+# Line index configuration
+LINE_INDEX_MIN_SIZE = int(float(os.getenv("LINE_INDEX_MIN_MB", "8")) * 1024 * 1024)  # Smaller files are just re-read
+LINE_INDEX_CACHE_SIZE = int(os.getenv("LINE_INDEX_CACHE_SIZE", "8"))  # Loaded indexes kept in memory
+SIDECAR_SUFFIX = '.lidx'
+SIDECAR_MAGIC = b'CWLIDX1\n'
+SIDECAR_HEADER = struct.Struct('<8sQqQ32sB?')  # magic, size, mtime_ns, lines, sample digest, format, yearless
+SAMPLE_BLOCK = 64 * 1024  # Head, middle and tail blocks hashed to detect rewritten content
+
+# Formats with exactly one record per non-blank line; JSON events and CSV rows can span lines
+LINE_PARSERS = {
+    'text': parse_text_logs,
+    'cisco': parse_cisco_logs,
+    'polycom': parse_polycom_logs,
+}
+INDEXED_FORMATS = tuple(LINE_PARSERS)
+NO_TIME = float('nan')
+
+def sample_digest(filepath, size):
+    """SHA-256 over the size and the head, middle and tail blocks of a file"""
+    digest = hashlib.sha256(str(size).encode('ascii'))
+    with open(filepath, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_BLOCK // 2), max(0, size - SAMPLE_BLOCK)}):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_BLOCK))
+    return digest.digest()
+
+class LineIndex:
+    """Byte offset, severity and timestamp of every non-blank line of a raw log file
+
+    Line i is record i of the format's parser, so slices of the index are slices of the parsed log.
+    """
+
+    def __init__(self, path, log_format, offsets, levels, times, yearless, size, mtime_ns, digest):
+        self.path = path
+        self.log_format = log_format
+        self.offsets = offsets  # array('Q'): byte offset where each line starts
+        self.levels = levels  # array('B'): Level code of each line
+        self.times = times  # array('d'): epoch seconds of each line, NaN without a timestamp
+        self.yearless = yearless  # No timestamp carried a year (syslog, Cisco)
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def matches(self, size, mtime_ns, digest):
+        return self.size == size and self.mtime_ns == mtime_ns and self.digest == digest
+
+    def _end(self, line):
+        return self.offsets[line + 1] if line + 1 < len(self.offsets) else self.size
+
+    def _lines(self, mm, first, last, min_level):
+        if not min_level:
+            # One contiguous range of the mapped file, decoded a chunk at a time
+            start, end = self.offsets[first], self._end(last)
+            yield from iter_lines(decode_chunks(mm[offset:min(offset + CHUNK_SIZE, end)]
+                                                for offset in range(start, end, CHUNK_SIZE)))
+            return
+        levels = self.levels
+        for line in range(first, last + 1):
+            if levels[line] >= min_level:
+                # Cut like iter_lines does; UTF-8 needs at most 4 bytes per character
+                start = self.offsets[line]
+                text = mm[start:min(self._end(line), start + 4 * MAX_LINE_LENGTH)].decode('utf-8', errors='ignore')
+                yield text.split('\n', 1)[0][:MAX_LINE_LENGTH].rstrip('\r')
+
+    def records(self, first=0, last=None, min_level=Level.UNKNOWN):
+        """Parse only lines first..last (inclusive), optionally only those at or above min_level"""
+        last = len(self.offsets) - 1 if last is None else min(last, len(self.offsets) - 1)
+        if first > last:
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from LINE_PARSERS[self.log_format](self._lines(mm, first, last, min_level))
+
+    def entries(self):
+        """(time or None, has year, level) per line, as the time index is built from"""
+        has_year = not self.yearless
+        for moment, level in zip(self.times, self.levels):
+            yield (None if math.isnan(moment) else moment), has_year, level
+
+    def count_at_least(self, min_level):
+        return sum(1 for level in self.levels if level >= min_level)
+
+    def save(self, sidecar_path):
+        """Write the index atomically; an unwritable directory just leaves it in memory"""
+        header = SIDECAR_HEADER.pack(SIDECAR_MAGIC, self.size, self.mtime_ns, len(self.offsets), self.digest,
+                                     INDEXED_FORMATS.index(self.log_format), self.yearless)
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(sidecar_path) or '.')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                for values in (self.offsets, self.levels, self.times):
+                    values.tofile(f)
+            os.replace(temp_path, sidecar_path)
+        except OSError:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @classmethod
+    def load(cls, path, sidecar_path):
+        """Index read from a sidecar file, or None when it is missing or unreadable"""
+        try:
+            with open(sidecar_path, 'rb') as f:
+                magic, size, mtime_ns, lines, digest, format_code, yearless = SIDECAR_HEADER.unpack(
+                    f.read(SIDECAR_HEADER.size))
+                if magic != SIDECAR_MAGIC or format_code >= len(INDEXED_FORMATS):
+                    return None
+                offsets, levels, times = array('Q'), array('B'), array('d')
+                for values in (offsets, levels, times):
+                    values.fromfile(f, lines)
+        except (OSError, EOFError, struct.error):
+            return None
+        if sys.byteorder != 'little':
+            for values in (offsets, times):
+                values.byteswap()
+        return cls(path, INDEXED_FORMATS[format_code], offsets, levels, times, yearless, size, mtime_ns, digest)
+
+def build_line_index(filepath, log_format, size, mtime_ns, digest):
+    """Index a raw log in one pass: binary line reads for offsets, the format's parser for severities"""
+    offsets, levels, times = array('Q'), array('B'), array('d')
+
+    def indexed_lines(f):
+        offset = 0
+        for raw in f:
+            line = raw.decode('utf-8', errors='ignore').rstrip('\n')[:MAX_LINE_LENGTH].rstrip('\r')
+            # The parsers skip blank lines, so only the others get an index entry (and a record)
+            if line.strip():
+                offsets.append(offset)
+                yield line
+            offset += len(raw)
+
+    yearless = True
+    with open(filepath, 'rb') as f:
+        for record in LINE_PARSERS[log_format](indexed_lines(f)):
+            moment, has_year = record_time(record)
+            if has_year:
+                yearless = False
+            levels.append(record.level)
+            times.append(NO_TIME if moment is None else moment)
+    yearless = yearless and any(not math.isnan(moment) for moment in times)
+    return LineIndex(filepath, log_format, offsets, levels, times, yearless, size, mtime_ns, digest)
+
+class LineIndexCache:
+    """Line indexes of large raw logs: in memory, persisted as a sidecar next to each file"""
+
+    def __init__(self, max_entries=LINE_INDEX_CACHE_SIZE, min_size=LINE_INDEX_MIN_SIZE):
+        self.max_entries = max_entries
+        self.min_size = min_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, filepath, log_format=None):
+        """The file's line index, or None for small, compressed or multi-line formatted logs"""
+        stat = os.stat(filepath)
+        if stat.st_size < self.min_size or compression_kind(filepath):
+            return None
+        log_format = log_format or detect_log_format(filepath)
+        if log_format not in LINE_PARSERS:
+            return None
+
+        # Invalidated by size, modification time or a changed content sample
+        digest = sample_digest(filepath, stat.st_size)
+        key = os.path.realpath(filepath)
+        with self.lock:
+            index = self.entries.get(key)
+        if index is None or not index.matches(stat.st_size, stat.st_mtime_ns, digest):
+            sidecar_path = filepath + SIDECAR_SUFFIX
+            index = LineIndex.load(filepath, sidecar_path)
+            if index is None or not index.matches(stat.st_size, stat.st_mtime_ns, digest) \
+                    or index.log_format != log_format:
+                with stage_seconds.time(stage='line_index'):
+                    index = build_line_index(filepath, log_format, stat.st_size, stat.st_mtime_ns, digest)
+                index.save(sidecar_path)
+
+        with self.lock:
+            self.entries[key] = index
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return index
+
+def at_least(records, min_level):
+    """Records at or above a severity; parser notes always pass"""
+    for record in records:
+        if record.level >= min_level or record.kind == KIND_NOTE:
+            yield record
+
+def severity_log(filepath, min_level, log_format=None):
+    """Records of a log at or above a severity, sliced through its line index when it has one"""
+    index = line_indexes.get(filepath, log_format)
+    header = f"[SEVERITY FILTER - {min_level.name} and above"
+    if index is not None:
+        header += f": {index.count_at_least(min_level)} of {len(index)} lines]"
+        records = index.records(min_level=min_level)
+    else:
+        header += "]"
+        records = at_least(stream_log(filepath, log_format), min_level)
+    return chain([note_record(header)], records)
+
+def parse_min_level(name):
+    """Level from a request parameter such as 'error' or 'warn', or None when not given; raises ValueError"""
+    name = str(name or '').strip().upper()
+    if not name:
+        return None
+    level = Level.__members__.get('WARN' if name == 'WARNING' else name)
+    if level is None or level == Level.UNKNOWN:
+        raise ValueError("Severity must be one of debug, info, warn, error or critical")
+    return level
+
+# Global line index cache
+line_indexes = LineIndexCache()
\ No newline at end of file
@@ -0,0 +1,366 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+
+# Connection pool, timeout and retry configuration
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))  # Pooled keep-alive connections to the LLM server
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))  # Seconds to establish a connection
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "180"))  # Seconds without data before a call fails
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # Retries per call after the first attempt
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # First retry delay, doubled each time
+LLM_RETRY_BACKOFF_MAX = 8.0  # Upper bound on a single retry delay
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # Consecutive failures that open the circuit
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # Seconds before a trial call is let through
+
+# Multi-backend routing
+LLM_HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "60"))  # Seconds between health probes of each backend
+LATENCY_SMOOTHING = 0.3  # Weight of the newest call in the moving latency average
+THROUGHPUT_WINDOW = 60  # Seconds of completed calls counted for throughput
+
+def retryable_errors():
+    """Errors worth retrying: the server was unreachable, timed out, overloaded or failed internally"""
+    # The OpenAI SDK (with httpx and pydantic) is only imported once a client is first used
+    from openai import APIConnectionError, RateLimitError, InternalServerError
+    return APIConnectionError, RateLimitError, InternalServerError
+
+def backend_errors():
+    """Errors that mean the backend itself is unhealthy (rate limiting is not)"""
+    from openai import APIConnectionError, InternalServerError
+    return APIConnectionError, InternalServerError
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the backend while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Fails fast after repeated backend failures, then lets one trial call through per cooldown"""
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the backend now"""
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            retry_in = max(0, round(self.cooldown - (time.time() - self.opened_at)))
+        raise CircuitOpenError(
+            f"LLM backend unavailable after {self.failures} consecutive failures; "
+            f"not retrying for {retry_in}s"
+        )
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.threshold:
+                # A failed trial call restarts the cooldown
+                self.opened_at = time.time()
+
+class LLMClient:
+    """Pooled chat completions client with timeouts, bounded retries and a circuit breaker"""
+
+    def __init__(self, base_url, api_key, pool_size=LLM_POOL_SIZE, connect_timeout=LLM_CONNECT_TIMEOUT,
+                 read_timeout=LLM_READ_TIMEOUT, max_retries=LLM_MAX_RETRIES, backoff=LLM_RETRY_BACKOFF,
+                 breaker=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.sdk = None  # OpenAI client and its connection pool, created on first use
+        self.sdk_lock = threading.Lock()
+        self.counters = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+        self.lock = threading.Lock()
+
+    @property
+    def openai(self):
+        """The OpenAI SDK client; importing the SDK and opening the pool waits until a call needs them"""
+        if self.sdk is None:
+            with self.sdk_lock:
+                if self.sdk is None:
+                    import httpx
+                    from openai import OpenAI
+                    timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+                    # One shared connection pool for every worker thread; retries are handled here, not by the SDK
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(max_connections=self.pool_size,
+                                            max_keepalive_connections=self.pool_size),
+                        timeout=timeout
+                    )
+                    self.sdk = OpenAI(base_url=self.base_url, api_key=self.api_key, http_client=http_client,
+                                      timeout=timeout, max_retries=0)
+        return self.sdk
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _retry_delay(self, attempt):
+        # Exponential backoff with jitter, so retrying workers do not arrive together
+        delay = min(LLM_RETRY_BACKOFF_MAX, self.backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def create(self, timeout=None, **options):
+        """chat.completions.create with the pool's timeouts, retries and circuit breaker
+
+        timeout overrides the read timeout for this call. With stream=True the
+        returned iterator reports its outcome to the breaker when it finishes.
+        """
+        self._count('calls')
+        sdk = self.openai
+        if timeout is not None:
+            import httpx
+            options['timeout'] = httpx.Timeout(timeout, connect=min(timeout, self.connect_timeout))
+
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count('rejected')
+                raise
+
+            try:
+                response = sdk.chat.completions.create(**options)
+            except retryable_errors() as e:
+                if isinstance(e, backend_errors()):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                attempt += 1
+                self._count('retries')
+                continue
+            except Exception:
+                # Client errors (bad request, auth) mean the backend itself answered
+                self.breaker.record_success()
+                self._count('failures')
+                raise
+
+            if options.get('stream'):
+                return self._watch_stream(response)
+            self.breaker.record_success()
+            return response
+
+    def _watch_stream(self, stream):
+        """Yield streamed chunks, recording how the stream ended against the breaker"""
+        succeeded = failed = False
+        try:
+            for chunk in stream:
+                yield chunk
+            succeeded = True
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            elif failed:
+                self.breaker.record_failure()
+                self._count('failures')
+            else:
+                # Abandoned by the caller: says nothing about the backend, but frees a half-open trial
+                self.breaker.release_trial()
+
+    def stats(self):
+        """Call counters and breaker state, for the monitoring endpoint"""
+        with self.lock:
+            stats = dict(self.counters)
+        stats['breaker_state'] = self.breaker.state
+        stats['consecutive_failures'] = self.breaker.failures
+        return stats
+
+class Backend:
+    """One model server in the pool, with its load and latency statistics"""
+
+    def __init__(self, client):
+        self.client = client
+        self.url = client.base_url
+        self.healthy = True
+        self.in_flight = 0
+        self.latency = None  # Moving average of call latency in seconds
+        self.requests = 0
+        self.failures = 0
+        self.completed = deque()  # Completion times within the throughput window
+        self.last_error = None
+
+    def score(self, default_latency):
+        """Lower is better: queued work weighted by how slow this backend has been recently"""
+        latency = self.latency if self.latency is not None else default_latency
+        return (self.in_flight + 1) * latency
+
+    def available(self):
+        return self.healthy and self.client.breaker.state != 'open'
+
+class BackendPool:
+    """Routes each call to the least-loaded healthy backend and fails over to the others"""
+
+    def __init__(self, urls, api_key, health_interval=LLM_HEALTH_INTERVAL, **client_options):
+        self.backends = [Backend(LLMClient(url, api_key, **client_options)) for url in urls]
+        self.health_interval = health_interval
+        self.probe = None
+        self.health_thread = None
+        self.lock = threading.Lock()
+
+    def _acquire(self, tried):
+        with self.lock:
+            candidates = [b for b in self.backends if b not in tried and b.available()]
+            if not candidates:
+                # Every backend looks down: still try one rather than failing without a call
+                candidates = [b for b in self.backends if b not in tried]
+            if not candidates:
+                return None
+            # Backends without calls yet are assumed as fast as the fastest one, so they get tried
+            known = [b.latency for b in self.backends if b.latency is not None]
+            default_latency = min(known) if known else 1.0
+            backend = min(candidates, key=lambda b: b.score(default_latency))
+            backend.in_flight += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend, started, error=None):
+        now = time.time()
+        with self.lock:
+            backend.in_flight -= 1
+            if error is not None:
+                backend.failures += 1
+                backend.last_error = str(error)
+                return
+            elapsed = now - started
+            if backend.latency is None:
+                backend.latency = elapsed
+            else:
+                backend.latency += LATENCY_SMOOTHING * (elapsed - backend.latency)
+            backend.completed.append(now)
+            while backend.completed and backend.completed[0] < now - THROUGHPUT_WINDOW:
+                backend.completed.popleft()
+
+    def create(self, **options):
+        """chat.completions.create on the best backend, failing over when it is unreachable"""
+        self._start_health_checks()
+        tried = []
+        while True:
+            backend = self._acquire(tried)
+            tried.append(backend)
+            started = time.time()
+            try:
+                response = backend.client.create(**options)
+            except (CircuitOpenError,) + retryable_errors() as e:
+                self._release(backend, started, e)
+                if len(tried) >= len(self.backends):
+                    raise
+                continue
+            except Exception as e:
+                self._release(backend, started, e)
+                raise
+
+            if options.get('stream'):
+                return self._track_stream(backend, started, response)
+            self._release(backend, started)
+            return response
+
+    def _track_stream(self, backend, started, stream):
+        """Keep the backend's in-flight count until the stream is fully consumed"""
+        error = None
+        try:
+            for chunk in stream:
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(backend, started, error)
+
+    def warm(self):
+        """Create every backend's SDK client ahead of the first call"""
+        for backend in self.backends:
+            backend.client.openai
+
+    def set_health_probe(self, probe):
+        """probe(client) -> True when the backend answers; run periodically when there are several backends"""
+        self.probe = probe
+
+    def _start_health_checks(self):
+        if self.health_thread or not self.probe or len(self.backends) < 2 or self.health_interval <= 0:
+            return
+        with self.lock:
+            if self.health_thread:
+                return
+            self.health_thread = threading.Thread(target=self._health_loop, name='llm-health', daemon=True)
+            self.health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            self.check_health()
+
+    def check_health(self):
+        """Probe every backend and take the ones that fail out of rotation"""
+        for backend in self.backends:
+            try:
+                healthy = bool(self.probe(backend.client))
+            except Exception:
+                healthy = False
+            with self.lock:
+                backend.healthy = healthy
+
+    def stats(self):
+        """Aggregate and per-backend counters, for the monitoring endpoint"""
+        now = time.time()
+        backends = []
+        with self.lock:
+            for backend in self.backends:
+                recent = sum(1 for t in backend.completed if t >= now - THROUGHPUT_WINDOW)
+                entry = backend.client.stats()
+                entry.update({
+                    'url': backend.url,
+                    'healthy': backend.healthy,
+                    'in_flight': backend.in_flight,
+                    'requests': backend.requests,
+                    'failures': backend.failures,
+                    'latency_ms': round(backend.latency * 1000, 1) if backend.latency is not None else None,
+                    'requests_per_minute': round(recent * 60 / THROUGHPUT_WINDOW, 1),
+                    'last_error': backend.last_error
+                })
+                backends.append(entry)
+        return {
+            'backends': backends,
+            'healthy_backends': sum(1 for b in backends if b['healthy'] and b['breaker_state'] != 'open'),
+            'in_flight': sum(b['in_flight'] for b in backends),
+            'requests_per_minute': round(sum(b['requests_per_minute'] for b in backends), 1)
+        }
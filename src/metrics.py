@@ -0,0 +1,149 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds: from in-memory parsing steps up to long LLM completions
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRIC_PREFIX = "causewise_"
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if isinstance(value, float) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.label_names, key)), value
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed durations, optionally split by labels"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [per-bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def samples(self):
+        with self.lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self.series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = tuple(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", labels + (('le', _format_value(float(bound))),), cumulative
+            yield self.name + "_bucket", labels + (('le', '+Inf'),), count
+            yield self.name + "_sum", labels, round(total, 6)
+            yield self.name + "_count", labels, count
+
+class MetricsRegistry:
+    """Metrics owned by the app plus collectors that read other components' stats at scrape time"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(self.prefix + name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self.prefix + name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """collect() -> iterable of (name, type, help, [(labels dict, value), ...]), called on every scrape"""
+        self.collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collect in self.collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                # A failing component must not take the whole scrape down
+                continue
+            for name, kind, help_text, values in families:
+                name = self.prefix + name
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    if value is None or isinstance(value, str):
+                        continue
+                    if isinstance(value, bool):
+                        value = int(value)
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# Global registry and the pipeline's own metrics
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    "stage_seconds", "Time spent in each analysis pipeline stage", labels=('stage',))
+bytes_processed = registry.counter(
+    "bytes_processed_total", "Bytes of log files read for analysis")
+lines_processed = registry.counter(
+    "lines_processed_total", "Log records parsed for analysis", labels=('format',))
+rejections = registry.counter(
+    "rejections_total", "Uploads, analyses and requests rejected, by reason", labels=('reason',))
\ No newline at end of file
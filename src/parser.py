@@ -1,110 +1,410 @@
 import json
 import csv
 import os
-from io import StringIO
+import re
+import time
+import codecs
+from itertools import chain
+from records import (
+    LogRecord, KIND_TEXT, KIND_JSON, KIND_CSV, KIND_CISCO, KIND_POLYCOM, CISCO_SEVERITY_LEVELS,
+    level_from_name, intern_field, note_record, render_records
+)
+from severity import get_classifier
+from metrics import stage_seconds, bytes_processed, lines_processed, rejections
+from compression import DecompressionLimitError, compression_kind, is_archive_name, open_log_members
 
-def detect_log_format(filepath):
-    """Detect the format of the log file based on extension and content"""
+# Streaming configuration
+CHUNK_SIZE = 64 * 1024  # Files are read once, in 64KB chunks
+MAX_JSON_EVENT_SIZE = 8 * 1024 * 1024  # Largest single JSON event we will buffer
+MAX_LINE_LENGTH = 1024 * 1024  # Longest line we will buffer; the rest of a longer line is dropped
+
+# Match severity keywords as whole words only (INFORMATION, ERRORS=0 stay unclassified)
+SEVERITY_WORD_BOUNDARY = os.getenv("SEVERITY_WORD_BOUNDARY", "false").lower() == "true"
+
+# A JSON document starts with an object or an array of objects/arrays,
+# not with a bracketed timestamp like "[2024-07-29 12:45:10]"
+JSON_START_PATTERN = re.compile(r'^\s*(\{|\[\s*(\{|\[|\]|$))')
+
+# Cisco IOS: [seq:] [*|.]Mmm dd [yyyy] hh:mm:ss[.mmm]: %FACILITY-SEVERITY-MNEMONIC: message
+CISCO_LINE_PATTERN = re.compile(
+    r'^(?:\d+:\s*)?'
+    r'(?P<timestamp>[*.]?[A-Z][a-z]{2}\s+\d{1,2}\s+(?:\d{4}\s+)?\d{2}:\d{2}:\d{2}(?:\.\d+)?)'
+    r'(?:\s+[A-Z]{2,5})?:\s+'
+    r'%(?P<code>(?P<facility>[A-Z0-9_]+)-(?P<severity>[0-7])-[A-Z0-9_]+):\s*'
+    r'(?P<message>.*)$'
+)
+
+# Polycom: yyyy-mm-dd hh:mm:ss,mmm LEVEL [Component] message
+POLYCOM_LINE_PATTERN = re.compile(
+    r'^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})\s+'
+    r'(?P<level>[A-Z]+)\s+'
+    r'\[(?P<component>[^\]]+)\]\s*'
+    r'(?P<message>.*)$'
+)
+POLYCOM_CALL_ID_PATTERN = re.compile(r'call[ _-]?id[:=]?\s*(?P<call_id>[\w@.-]+)', re.IGNORECASE)
+
+def decode_chunks(blocks):
+    """Decode a stream of byte blocks as UTF-8 incrementally"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def read_blocks(filepath, chunk_size=CHUNK_SIZE):
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            yield block
+
+def read_chunks(filepath, chunk_size=CHUNK_SIZE):
+    """Read a file once in fixed-size chunks, decoding UTF-8 incrementally"""
+    return decode_chunks(read_blocks(filepath, chunk_size))
+
+def iter_lines(chunks, max_length=MAX_LINE_LENGTH):
+    """Split a stream of text chunks into lines without joining the chunks
+
+    Lines are cut at max_length, so a file without newlines is never held in memory whole.
+    """
+    pending = []  # Pieces of a line continued from earlier chunks
+    pending_length = 0
+    for chunk in chunks:
+        lines = chunk.split('\n')
+        if len(lines) == 1:
+            # Past the cap the pieces are dropped, as the line will be cut anyway
+            if pending_length <= max_length:
+                pending.append(chunk)
+                pending_length += len(chunk)
+            continue
+        if pending:
+            pending.append(lines[0])
+            lines[0] = "".join(pending)
+        # The last piece may be an incomplete line continued in the next chunk
+        tail = lines.pop()
+        pending = [tail] if tail else []
+        pending_length = len(tail)
+        for line in lines:
+            if len(line) > max_length:
+                line = line[:max_length]
+            yield line.rstrip('\r')
+    if pending_length:
+        yield "".join(pending)[:max_length].rstrip('\r')
+
+def sniff_log_format(filepath, head):
+    """Detect the log format from the file extension and the first chunk of content"""
     _, ext = os.path.splitext(filepath.lower())
-    
+
     if ext == '.json':
         return 'json'
     elif ext == '.csv':
         return 'csv'
     elif ext in ['.txt', '.log']:
         # Try to detect if it's structured data
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            first_line = f.readline().strip()
-            if first_line.startswith('[') or first_line.startswith('{'):
-                return 'json'
-            elif ',' in first_line and '"' in first_line:
-                return 'csv'
-            else:
-                return 'text'
+        first_line = head.lstrip().split('\n', 1)[0].strip()
+        if JSON_START_PATTERN.match(first_line):
+            return 'json'
+        elif ',' in first_line and '"' in first_line:
+            return 'csv'
+        elif CISCO_LINE_PATTERN.match(first_line):
+            return 'cisco'
+        elif POLYCOM_LINE_PATTERN.match(first_line):
+            return 'polycom'
+        else:
+            return 'text'
     else:
         return 'text'
 
-def parse_log(filepath):
-    """Enhanced parser that handles multiple log formats"""
-    content = ""
+def detect_log_format(filepath):
+    """Detect the format of the log file based on extension and content"""
+    if compression_kind(filepath):
+        # The first log inside a compressed file decides
+        for name, blocks in open_log_members(filepath):
+            return sniff_log_format(name, next(decode_chunks(blocks), ''))
+        return 'text'
+    head = next(read_chunks(filepath), '')
+    return sniff_log_format(filepath, head)
+
+def _measured(records, log_format):
+    """Yield records, timing the parser alone (not its consumer) and counting them"""
+    elapsed = 0.0
+    count = 0
+    clock = time.perf_counter
     try:
-        log_format = detect_log_format(filepath)
-        
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        if log_format == 'json':
-            return parse_json_logs(content)
-        elif log_format == 'csv':
-            return parse_csv_logs(content)
-        else:
-            return parse_text_logs(content)
-            
+        start_time = clock()
+        for record in records:
+            elapsed += clock() - start_time
+            count += 1
+            yield record
+            start_time = clock()
+        elapsed += clock() - start_time
+    finally:
+        stage_seconds.observe(elapsed, stage='parsing')
+        lines_processed.inc(count, format=log_format)
+
+def _parse_chunks(name, chunks, log_format=None):
+    """Parse one log's text chunks, detecting its format from the first chunk unless given"""
+    if log_format is None:
+        with stage_seconds.time(stage='format_detection'):
+            head = next(chunks, '')
+            log_format = sniff_log_format(name, head)
+        chunks = chain([head], chunks)
+
+    if log_format == 'json':
+        yield from _measured(parse_json_logs(chunks), log_format)
+        return
+
+    lines = iter_lines(chunks)
+    if log_format == 'csv':
+        records = parse_csv_logs(lines)
+    elif log_format == 'cisco':
+        records = parse_cisco_logs(lines)
+    elif log_format == 'polycom':
+        records = parse_polycom_logs(lines)
+    else:
+        records = parse_text_logs(lines)
+    yield from _measured(records, log_format)
+
+def stream_log(filepath, log_format=None):
+    """Stream parsed LogRecords from a file, reading it exactly once
+
+    log_format skips detection when it is already known, e.g. sniffed while the file was uploaded.
+    Compressed files and archives are inflated block by block as they are parsed.
+    """
+    try:
+        bytes_processed.inc(os.path.getsize(filepath))
+        if not compression_kind(filepath):
+            yield from _parse_chunks(filepath, read_chunks(filepath), log_format)
+            return
+
+        archive = is_archive_name(filepath)
+        for name, blocks in open_log_members(filepath, CHUNK_SIZE):
+            if archive:
+                # Each member is parsed in its own format; the header keeps their lines apart
+                yield note_record(f"=== {name} ===")
+            yield from _parse_chunks(name, decode_chunks(blocks))
+
+    except DecompressionLimitError as e:
+        rejections.inc(reason='decompression_limit')
+        yield note_record(f"[TRUNCATED - {str(e)}]")
     except Exception as e:
-        return f"Error reading file: {str(e)}\n\nRaw content:\n{content if content else 'Unable to read file'}"
+        yield note_record(f"Error reading file: {str(e)}")
+
+def parse_log(filepath, log_format=None):
+    """Enhanced parser that handles multiple log formats"""
+    return "\n".join(render_records(stream_log(filepath, log_format)))
+
+def _as_lines(content):
+    """Accept either a whole string or an already streamed iterable of lines"""
+    if isinstance(content, str):
+        return iter(content.split('\n'))
+    return iter(content)
+
+def _json_event_record(entry):
+    """Build a record from a single Splunk-style JSON event"""
+    # Extract key information
+    timestamp = entry.get('_time', entry.get('timestamp', 'Unknown'))
+    level = entry.get('level', entry.get('severity', 'INFO'))
+    message = entry.get('message', entry.get('_raw', str(entry)))
+    host = entry.get('host', 'Unknown')
+    source = entry.get('source', entry.get('sourcetype', 'Unknown'))
+
+    return LogRecord(KIND_JSON, level_from_name(level), str(message),
+                     level_name=intern_field(level), timestamp=str(timestamp),
+                     host=intern_field(host), source=intern_field(source))
+
+class JSONEventReader:
+    """Incrementally decode a JSON array or NDJSON stream into one event at a time"""
+
+    WHITESPACE = ' \t\r\n'
+
+    def __init__(self, chunks, max_event_size=MAX_JSON_EVENT_SIZE):
+        self.chunks = iter(chunks)
+        self.max_event_size = max_event_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.dropped = 0
+        self.eof = False
+        self.is_array = False
+        self.truncated = False
+        self.events_read = 0
+
+    def _fill(self):
+        """Append the next chunk to the buffer, dropping already decoded text"""
+        if self.pos:
+            self.dropped += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _skip_whitespace(self):
+        """Advance to the next significant character, reading more data as needed"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.pos < len(self.buffer)
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def remainder(self):
+        """Text not yet decoded followed by the unread chunks, for text fallback"""
+        if not self.dropped:
+            # Nothing has been discarded yet, so replay the content from the start
+            return chain([self.buffer], self.chunks)
+        return chain([self.buffer[self.pos:]], self.chunks)
+
+    def __iter__(self):
+        if not self._skip_whitespace():
+            return
+        if self.buffer[self.pos] == '[':
+            self.is_array = True
+            self.pos += 1
+        elif self.buffer[self.pos] != '{':
+            raise self._error("Expecting JSON array or object")
+
+        expect_delimiter = False
+        while self._skip_whitespace():
+            if self.is_array:
+                if self.buffer[self.pos] == ']':
+                    return
+                if expect_delimiter:
+                    if self.buffer[self.pos] != ',':
+                        raise self._error("Expecting ',' delimiter")
+                    self.pos += 1
+                    expect_delimiter = False
+                    continue
+
+            try:
+                entry, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value ending exactly at the buffer edge may continue in the next chunk
+                complete = end < len(self.buffer) or self.eof
+            except json.JSONDecodeError:
+                complete = False
+
+            if not complete:
+                if self.eof or len(self.buffer) - self.pos > self.max_event_size:
+                    break
+                self._fill()
+                continue
+
+            self.pos = end
+            self.events_read += 1
+            expect_delimiter = self.is_array
+            yield entry
+
+        # Input ended inside the array or inside an element
+        if not self.events_read:
+            raise self._error("Unable to decode JSON event")
+        if self.is_array or self.pos < len(self.buffer):
+            # Tolerate a cut-off final element (e.g. an interrupted export)
+            self.truncated = True
 
 def parse_json_logs(content):
-    """Parse JSON formatted logs (like Splunk exports)"""
+    """Parse JSON formatted logs (like Splunk exports), yielding one record per event"""
+    chunks = [content] if isinstance(content, str) else content
+    reader = JSONEventReader(chunks)
+    first = None
+    emitted = 0
+
     try:
-        # Try to parse as JSON array first
-        data = json.loads(content)
-        if isinstance(data, list):
+        for entry in reader:
+            if not reader.is_array:
+                # Hold the first object back until we know it is not a lone document
+                if reader.events_read == 1:
+                    first = entry
+                    continue
+                if reader.events_read == 2 and isinstance(first, dict):
+                    emitted += 1
+                    yield _json_event_record(first)
             # Splunk-style JSON logs
-            parsed_logs = []
-            for entry in data:
-                if isinstance(entry, dict):
-                    # Extract key information
-                    timestamp = entry.get('_time', entry.get('timestamp', 'Unknown'))
-                    level = entry.get('level', entry.get('severity', 'INFO'))
-                    message = entry.get('message', entry.get('_raw', str(entry)))
-                    host = entry.get('host', 'Unknown')
-                    source = entry.get('source', entry.get('sourcetype', 'Unknown'))
-                    
-                    parsed_logs.append(f"[{timestamp}] {level} [{host}] {source}: {message}")
-            
-            return "\n".join(parsed_logs) + f"\n\n--- ORIGINAL JSON DATA ---\n{content}"
-        else:
-            # Single JSON object
-            return f"JSON Log Entry:\n{json.dumps(data, indent=2)}\n\n--- RAW DATA ---\n{content}"
+            if isinstance(entry, dict):
+                emitted += 1
+                yield _json_event_record(entry)
     except json.JSONDecodeError:
+        if emitted:
+            yield note_record("[TRUNCATED - Malformed JSON after this point]")
+            return
         # Not valid JSON, treat as text
-        return f"Invalid JSON format. Treating as text:\n\n{content}"
+        yield note_record("Invalid JSON format. Treating as text:")
+        yield from parse_text_logs(iter_lines(reader.remainder()))
+        return
+
+    if not reader.is_array and reader.events_read == 1:
+        # Single JSON object
+        yield note_record(f"JSON Log Entry:\n{json.dumps(first, indent=2)}")
+
+    if reader.truncated:
+        yield note_record("[TRUNCATED - JSON export ended mid-event]")
 
 def parse_csv_logs(content):
-    """Parse CSV formatted logs"""
+    """Parse CSV formatted logs, yielding one record per row"""
+    reader = csv.DictReader(_as_lines(content))
+
     try:
-        # Use StringIO to treat string as file
-        csv_file = StringIO(content)
-        reader = csv.DictReader(csv_file)
-        
-        parsed_logs = []
         for row in reader:
             # Try to identify common log fields
             timestamp = row.get('timestamp', row.get('time', row.get('date', 'Unknown')))
             level = row.get('level', row.get('severity', row.get('priority', 'INFO')))
             message = row.get('message', row.get('description', row.get('event', str(row))))
-            
-            parsed_logs.append(f"[{timestamp}] {level}: {message}")
-        
-        return "\n".join(parsed_logs) + f"\n\n--- ORIGINAL CSV DATA ---\n{content}"
-    except Exception as e:
-        return f"Error parsing CSV: {str(e)}\n\nRaw content:\n{content}"
-
-def parse_text_logs(content):
-    """Parse plain text logs with intelligent formatting"""
-    lines = content.split('\n')
-    parsed_lines = []
-    
-    for line in lines:
+
+            yield LogRecord(KIND_CSV, level_from_name(level), str(message),
+                            level_name=intern_field(level), timestamp=timestamp)
+    except csv.Error as e:
+        yield note_record(f"Error parsing CSV: {str(e)}")
+
+def parse_text_logs(content, word_boundary=SEVERITY_WORD_BOUNDARY):
+    """Parse plain text logs into records, classifying severity per line"""
+    classify = get_classifier(word_boundary).classify
+    for line in _as_lines(content):
         if line.strip():
-            # Try to identify and highlight important patterns
-            if any(keyword in line.upper() for keyword in ['ERROR', 'CRITICAL', 'FATAL']):
-                parsed_lines.append(f"🔴 {line}")
-            elif any(keyword in line.upper() for keyword in ['WARN', 'WARNING']):
-                parsed_lines.append(f"🟡 {line}")
-            elif any(keyword in line.upper() for keyword in ['INFO', 'DEBUG', 'TRACE']):
-                parsed_lines.append(f"🔵 {line}")
-            else:
-                parsed_lines.append(f"⚪ {line}")
-    
-    return "\n".join(parsed_lines)
\ No newline at end of file
+            yield LogRecord(KIND_TEXT, classify(line), line)
+
+def parse_cisco_logs(content, word_boundary=SEVERITY_WORD_BOUNDARY):
+    """Parse Cisco IOS logs, extracting the timestamp and %FACILITY-SEVERITY-MNEMONIC code"""
+    classify = get_classifier(word_boundary).classify
+    for line in _as_lines(content):
+        if not line.strip():
+            continue
+        match = CISCO_LINE_PATTERN.match(line)
+        if match:
+            yield LogRecord(KIND_CISCO, CISCO_SEVERITY_LEVELS[int(match.group('severity'))],
+                            match.group('message'), timestamp=match.group('timestamp'),
+                            source=intern_field(match.group('facility')),
+                            code=intern_field(match.group('code')))
+        else:
+            # Continuation lines and non-syslog output stay plain text
+            yield LogRecord(KIND_TEXT, classify(line), line)
+
+def parse_polycom_logs(content, word_boundary=SEVERITY_WORD_BOUNDARY):
+    """Parse Polycom VoIP logs, extracting the level, [Component] and call IDs"""
+    classify = get_classifier(word_boundary).classify
+    for line in _as_lines(content):
+        if not line.strip():
+            continue
+        match = POLYCOM_LINE_PATTERN.match(line)
+        if match:
+            message = match.group('message')
+            call_id = None
+            if 'call' in message.lower():
+                call_match = POLYCOM_CALL_ID_PATTERN.search(message)
+                if call_match:
+                    call_id = call_match.group('call_id')
+            level = match.group('level')
+            yield LogRecord(KIND_POLYCOM, level_from_name(level), message,
+                            level_name=intern_field(level), timestamp=match.group('timestamp'),
+                            source=intern_field(match.group('component')), call_id=call_id)
+        else:
+            # Stack traces and other multi-line output stay plain text
+            yield LogRecord(KIND_TEXT, classify(line), line)
@@ -0,0 +1,112 @@
+import sys
+from enum import IntEnum
+
+class Level(IntEnum):
+    """Normalized severity codes, ordered so records can be filtered with comparisons"""
+    UNKNOWN = 0
+    DEBUG = 1
+    INFO = 2
+    WARN = 3
+    ERROR = 4
+    CRITICAL = 5
+
+# Severity names seen in JSON/CSV level fields, mapped to level codes
+LEVEL_NAMES = {
+    'TRACE': Level.DEBUG,
+    'DEBUG': Level.DEBUG,
+    'INFO': Level.INFO,
+    'INFORMATION': Level.INFO,
+    'NOTICE': Level.INFO,
+    'WARN': Level.WARN,
+    'WARNING': Level.WARN,
+    'ERROR': Level.ERROR,
+    'ERR': Level.ERROR,
+    'CRITICAL': Level.CRITICAL,
+    'CRIT': Level.CRITICAL,
+    'FATAL': Level.CRITICAL,
+    'ALERT': Level.CRITICAL,
+    'EMERGENCY': Level.CRITICAL,
+}
+
+# Cisco IOS severity digits (0 emergencies .. 7 debugging) mapped to level codes
+CISCO_SEVERITY_LEVELS = (
+    Level.CRITICAL, Level.CRITICAL, Level.CRITICAL, Level.ERROR,
+    Level.WARN, Level.INFO, Level.INFO, Level.DEBUG,
+)
+
+# Markers used when rendering plain text records
+LEVEL_MARKERS = {
+    Level.UNKNOWN: '⚪',
+    Level.DEBUG: '🔵',
+    Level.INFO: '🔵',
+    Level.WARN: '🟡',
+    Level.ERROR: '🔴',
+    Level.CRITICAL: '🔴',
+}
+
+# Record kinds, one per parser, plus notes emitted by the parsers themselves
+KIND_TEXT = 'text'
+KIND_JSON = 'json'
+KIND_CSV = 'csv'
+KIND_CISCO = 'cisco'
+KIND_POLYCOM = 'polycom'
+KIND_NOTE = 'note'
+
+def level_from_name(name):
+    """Map a free-form severity name to a level code"""
+    return LEVEL_NAMES.get(str(name).strip().upper(), Level.UNKNOWN)
+
+def intern_field(value):
+    """Intern repeated low-cardinality fields like host and source"""
+    return sys.intern(str(value))
+
+class LogRecord:
+    """Compact parsed log event; rendered back to text only when needed"""
+    __slots__ = ('kind', 'level', 'level_name', 'timestamp', 'host', 'source', 'message', 'code', 'call_id',
+                 'origin')
+
+    def __init__(self, kind, level, message, level_name=None, timestamp=None, host=None, source=None,
+                 code=None, call_id=None, origin=None):
+        self.kind = kind
+        self.level = level
+        self.message = message
+        self.level_name = level_name
+        self.timestamp = timestamp
+        self.host = host
+        self.source = source
+        # Vendor fields: Cisco FACILITY-SEVERITY-MNEMONIC code, Polycom call ID
+        self.code = code
+        self.call_id = call_id
+        # Log file the record came from, set when several logs are merged into one timeline
+        self.origin = origin
+
+    def __repr__(self):
+        return f"LogRecord({self.kind!r}, {self.level.name}, {self.message[:40]!r})"
+
+def note_record(message):
+    """Informational line produced by a parser (errors, truncation notices)"""
+    return LogRecord(KIND_NOTE, Level.UNKNOWN, message)
+
+def render_record(record):
+    """Render a record to the same text the parsers used to produce, tagged with its file in a merged timeline"""
+    if record.origin is not None:
+        return f"[{record.origin}] {_render_line(record)}"
+    return _render_line(record)
+
+def _render_line(record):
+    if record.kind == KIND_TEXT:
+        return f"{LEVEL_MARKERS[record.level]} {record.message}"
+    elif record.kind == KIND_JSON:
+        return f"[{record.timestamp}] {record.level_name} [{record.host}] {record.source}: {record.message}"
+    elif record.kind == KIND_CSV:
+        return f"[{record.timestamp}] {record.level_name}: {record.message}"
+    elif record.kind == KIND_CISCO:
+        return f"{LEVEL_MARKERS[record.level]} {record.timestamp}: %{record.code}: {record.message}"
+    elif record.kind == KIND_POLYCOM:
+        return f"{LEVEL_MARKERS[record.level]} {record.timestamp} {record.level_name} [{record.source}] {record.message}"
+    return record.message
+
+def render_records(records):
+    """Render a stream of records, passing through lines that are already text"""
+    for record in records:
+        yield record if isinstance(record, str) else render_record(record)
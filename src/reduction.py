@@ -0,0 +1,204 @@
+import re
+from records import (
+    LogRecord, KIND_TEXT, KIND_JSON, KIND_CSV, KIND_CISCO, KIND_POLYCOM
+)
+from severity import get_classifier
+
+# Reduction configuration
+SIMILARITY_THRESHOLD = 0.5  # Fraction of matching tokens needed to join a template
+MAX_TEMPLATES = 5000        # Cap on distinct templates kept in memory
+MAX_EXAMPLES = 3            # Example variable sets kept per template
+MAX_BUCKET_SCAN = 100       # Templates compared per bucket before starting a new one
+MAX_EXACT_SHAPES = 50000    # Masked lines remembered for exact lookups before the similarity scan
+MAX_CALL_IDS = 1000         # Distinct call IDs counted per template
+WILDCARD = '<*>'
+CALL_ID_TOKEN = '<call>'    # Stands in for a Polycom call ID, which is listed per template instead
+
+# Tokens containing digits (IDs, IPs, counters, durations) are treated as variables
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Leading timestamps in plain text lines: ISO, bracketed ISO and syslog styles
+LEADING_TIMESTAMP_PATTERN = re.compile(
+    r'^\[?(?P<timestamp>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?Z?'
+    r'|[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\]?\s*'
+)
+
+class Template:
+    """A mined log event shape with its occurrence statistics"""
+    __slots__ = ('tokens', 'level', 'count', 'first_seen', 'last_seen', 'examples', 'calls', 'order')
+
+    def __init__(self, tokens, level, timestamp, order):
+        self.tokens = tokens
+        self.level = level
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.examples = []
+        self.calls = {}  # Call IDs the template occurred in, in first-seen order
+        self.order = order
+
+    def text(self):
+        return ' '.join(self.tokens)
+
+def _is_call_id_token(token, call_id):
+    """True for the token holding the call ID: 'abc@pbx', 'abc@pbx,' or 'call-id=abc@pbx'"""
+    token = token.rstrip(',;)')
+    if token == call_id:
+        return True
+    return token.endswith(call_id) and not token[-len(call_id) - 1].isalnum()
+
+def _template_text(record):
+    """The part of a record that defines its event shape, plus its timestamp"""
+    if record.kind == KIND_JSON:
+        return f"[{record.host}] {record.source}: {record.message}", record.timestamp
+    elif record.kind == KIND_CSV:
+        return record.message, record.timestamp
+    elif record.kind == KIND_CISCO:
+        return f"%{record.code}: {record.message}", record.timestamp
+    elif record.kind == KIND_POLYCOM:
+        return f"[{record.source}] {record.message}", record.timestamp
+
+    # Plain text carries its timestamp inside the line
+    match = LEADING_TIMESTAMP_PATTERN.match(record.message)
+    if match:
+        return record.message[match.end():], match.group('timestamp')
+    return record.message, None
+
+class TemplateMiner:
+    """Drain-style miner that collapses repeated log lines into templates with counts"""
+
+    def __init__(self, similarity_threshold=SIMILARITY_THRESHOLD, max_templates=MAX_TEMPLATES):
+        self.similarity_threshold = similarity_threshold
+        self.max_templates = max_templates
+        self.buckets = {}
+        self.exact = {}  # (kind, masked tokens) -> template that line joined
+        self.templates = []
+        self.total = 0
+        self.overflow = 0
+        self.classify = get_classifier().classify
+
+    def add(self, record):
+        """Fold one record (or plain text line) into the template set"""
+        if isinstance(record, str):
+            if not record.strip():
+                return
+            record = LogRecord(KIND_TEXT, self.classify(record), record)
+        self.total += 1
+
+        text, timestamp = _template_text(record)
+        if record.origin is not None:
+            # Templates never span files of a merged timeline
+            text = f"[{record.origin}] {text}"
+        raw_tokens = text.split()
+        tokens = [WILDCARD if DIGIT_PATTERN.search(token) else token for token in raw_tokens]
+        if record.call_id:
+            # One template per event across calls, whatever the call IDs look like
+            tokens = [CALL_ID_TOKEN if _is_call_id_token(raw, record.call_id) else token
+                      for raw, token in zip(raw_tokens, tokens)]
+
+        # Bucket by source kind, length and a constant first token, as Drain's parse tree does
+        key = (record.kind, len(tokens), tokens[0] if tokens else '')
+        bucket = self.buckets.setdefault(key, [])
+
+        shape = (record.kind, tuple(tokens))
+        template = self.exact.get(shape)
+        if template is None:
+            template = self._best_match(bucket, tokens)
+        if template is None:
+            if len(self.templates) >= self.max_templates:
+                self.overflow += 1
+                return
+            template = Template(tokens, record.level, timestamp, len(self.templates))
+            bucket.insert(0, template)
+            self.templates.append(template)
+        else:
+            if bucket[0] is not template:
+                # Most recently matched first, so the capped scan covers recent and frequent templates
+                bucket.remove(template)
+                bucket.insert(0, template)
+            # Positions that differ become wildcards
+            for i, token in enumerate(tokens):
+                if template.tokens[i] != token:
+                    template.tokens[i] = WILDCARD
+        if shape not in self.exact and len(self.exact) < MAX_EXACT_SHAPES:
+            self.exact[shape] = template
+
+        template.count += 1
+        if record.level > template.level:
+            template.level = record.level
+        if timestamp:
+            template.last_seen = timestamp
+            if template.first_seen is None:
+                template.first_seen = timestamp
+        if len(template.examples) < MAX_EXAMPLES:
+            variables = [raw for raw, token in zip(raw_tokens, template.tokens) if token == WILDCARD]
+            if variables and variables not in template.examples:
+                template.examples.append(variables)
+        if record.call_id and len(template.calls) < MAX_CALL_IDS:
+            template.calls[record.call_id] = None
+
+    def _best_match(self, bucket, tokens):
+        best = None
+        best_score = self.similarity_threshold
+        for template in bucket[:MAX_BUCKET_SCAN]:
+            same = 0
+            constants = 0
+            constants_matched = 0
+            for a, b in zip(template.tokens, tokens):
+                if a != WILDCARD:
+                    constants += 1
+                if a == b:
+                    same += 1
+                    if a != WILDCARD:
+                        constants_matched += 1
+            # Most constant tokens must also match, so a widely wildcarded
+            # template cannot keep absorbing unrelated lines
+            if constants and constants_matched * 2 < constants:
+                continue
+            score = same / len(tokens) if tokens else 1.0
+            if score >= best_score:
+                best, best_score = template, score
+        return best
+
+    def _render_template(self, template):
+        line = f"{template.level.name} x{template.count}"
+        if template.first_seen:
+            if template.first_seen != template.last_seen:
+                line += f" [{template.first_seen} .. {template.last_seen}]"
+            else:
+                line += f" [{template.first_seen}]"
+        line += f" {template.text()}"
+        if template.examples:
+            line += " | e.g. " + "; ".join(' '.join(example) for example in template.examples)
+        if template.calls:
+            calls = len(template.calls)
+            shown = ", ".join(list(template.calls)[:MAX_EXAMPLES])
+            line += f" | {calls}{'+' if calls >= MAX_CALL_IDS else ''} calls: {shown}"
+            if calls > MAX_EXAMPLES:
+                line += ", ..."
+        return line
+
+    def render(self, budget):
+        """Render templates in first-seen order, dropping the least severe ones to fit the budget"""
+        header = (f"LOG SUMMARY: {self.total} lines reduced to {len(self.templates)} event templates "
+                  f"(level, count, first/last timestamp, template, example variables, call IDs)")
+        rendered = {template.order: self._render_template(template) for template in self.templates}
+
+        # Keep the most severe templates first, in order of appearance
+        kept = set()
+        size = len(header)
+        for template in sorted(self.templates, key=lambda t: (-t.level, t.order)):
+            line_size = len(rendered[template.order]) + 1
+            if size + line_size > budget:
+                continue
+            kept.add(template.order)
+            size += line_size
+
+        lines = [header]
+        lines.extend(rendered[order] for order in sorted(kept))
+        omitted = len(self.templates) - len(kept)
+        if omitted:
+            lines.append(f"[{omitted} lower-severity templates omitted to fit the analysis budget]")
+        if self.overflow:
+            lines.append(f"[{self.overflow} lines beyond the {self.max_templates} template limit not shown]")
+        return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import re
+
+# Prompt injection and script patterns neutralized before log text reaches the LLM
+# (written in lowercase; matched case-insensitively)
+DANGEROUS_PATTERNS = [
+    r'ignore\s+previous\s+instructions',
+    r'forget\s+everything',
+    r'new\s+instructions',
+    r'system\s*:\s*you\s+are',
+    r'assistant\s*:\s*',
+    r'human\s*:\s*',
+    r'<\s*script\s*>',
+    r'javascript\s*:',
+    r'eval\s*\(',
+    r'exec\s*\(',
+]
+
+FILTERED = '[FILTERED]'
+MAX_WHITESPACE_RUN = 64  # Longer whitespace runs are cut to this length before matching, when structure is kept
+MAX_MATCH_LENGTH = 256  # Text held back between chunks so matches spanning a boundary are still found (longest is 205)
+
+# Control characters are dropped and whitespace runs normalized before matching, so
+# padding or control characters between the words of a pattern cannot hide it
+CONTROL_CHAR_TABLE = dict.fromkeys([*range(0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f])
+LONG_WHITESPACE_RUN_PATTERN = re.compile(r'\s{%d,}' % (MAX_WHITESPACE_RUN + 1))
+
+# Leading literal characters of a pattern, used to build a cheap prefilter
+LITERAL_PREFIX_PATTERN = re.compile(r'[\w<>]{1,2}')
+
+def _build_matcher(patterns):
+    """Compile one alternation with a named group per pattern"""
+    body = '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(patterns))
+
+    # A lookahead on the first two literal characters lets the engine reject
+    # almost every position without trying each branch in turn
+    prefixes = [LITERAL_PREFIX_PATTERN.match(pattern) for pattern in patterns]
+    if all(prefixes):
+        anchors = sorted({match.group().lower() for match in prefixes})
+        first = ''.join(sorted({re.escape(anchor[0]) for anchor in anchors}))
+        body = f"(?=[{first}])(?={'|'.join(map(re.escape, anchors))})(?:{body})"
+    return re.compile(body), re.compile(body, re.IGNORECASE)
+
+def _collapse_whitespace(text):
+    # str.split is much faster than a regex substitution; runs at either end are kept as one space
+    words = text.split()
+    if not words:
+        return ' ' if text else ''
+    collapsed = ' '.join(words)
+    if text[0].isspace():
+        collapsed = ' ' + collapsed
+    if text[-1].isspace():
+        collapsed += ' '
+    return collapsed
+
+def _shorten_whitespace(text):
+    return LONG_WHITESPACE_RUN_PATTERN.sub(lambda match: match.group()[:MAX_WHITESPACE_RUN], text)
+
+class ContentScanner:
+    """Single-pass matcher that filters dangerous patterns, counts them and strips control characters
+
+    Whitespace runs are collapsed to one space, or with preserve_structure only cut to
+    MAX_WHITESPACE_RUN, so every match fits in the text held back between chunks.
+    """
+
+    def __init__(self, patterns=DANGEROUS_PATTERNS, preserve_structure=False):
+        self.lower_matcher, self.matcher = _get_matchers(tuple(patterns))
+        self.normalize_whitespace = _shorten_whitespace if preserve_structure else _collapse_whitespace
+        self.hits = [0] * len(patterns)
+        self.pending = ''
+
+    def _matches(self, text):
+        # Matching on a lowercased copy is much faster than IGNORECASE; it is only
+        # valid while lowercasing keeps every character in place
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return self.lower_matcher.finditer(lowered)
+        return self.matcher.finditer(text)
+
+    def feed(self, chunk, final=False):
+        """Sanitize the next chunk; returns the text that is safe to emit so far"""
+        text = self.normalize_whitespace((self.pending + chunk).translate(CONTROL_CHAR_TABLE))
+
+        # Any match starting before the cut is at most MAX_MATCH_LENGTH long, so it is already complete.
+        # A trailing whitespace run is always held back, so it is normalized together with its continuation
+        cut = len(text) if final else len(text) - MAX_MATCH_LENGTH
+        if cut <= 0:
+            self.pending = text
+            return ''
+
+        out = []
+        pos = 0
+        for match in self._matches(text):
+            if match.start() >= cut:
+                break
+            out.append(text[pos:match.start()])
+            self.hits[int(match.lastgroup[1:])] += 1
+            out.append(FILTERED)
+            pos = match.end()
+        cut = max(cut, pos)
+        out.append(text[pos:cut])
+        self.pending = text[cut:]
+        return ''.join(out)
+
+    def finish(self):
+        """Flush the held-back tail at the end of the stream"""
+        return self.feed('', final=True)
+
+    @property
+    def suspicious_count(self):
+        """Number of distinct dangerous patterns seen"""
+        return sum(1 for count in self.hits if count)
+
+_matchers = {}
+
+def _get_matchers(patterns):
+    """Compiled matchers are shared between scanners for the same pattern list"""
+    if patterns not in _matchers:
+        _matchers[patterns] = _build_matcher(patterns)
+    return _matchers[patterns]
+
+def sanitize_text(text, preserve_structure=False):
+    """Filter dangerous patterns, strip control characters and normalize whitespace in one pass"""
+    return ContentScanner(preserve_structure=preserve_structure).feed(text, final=True)
+
+def sanitize_chunks(chunks, preserve_structure=False):
+    """Streaming form of sanitize_text for text that arrives in pieces"""
+    scanner = ContentScanner(preserve_structure=preserve_structure)
+    for chunk in chunks:
+        safe = scanner.feed(chunk)
+        if safe:
+            yield safe
+    tail = scanner.finish()
+    if tail:
+        yield tail
+
+def scan_content(chunks, max_suspicious=None):
+    """Scan text chunks once; returns (stripped length estimate, distinct suspicious patterns)
+
+    Stops early once more than max_suspicious distinct patterns have been seen.
+    The length is the span from the first to the last non-whitespace character.
+    """
+    scanner = ContentScanner()
+    offset = 0
+    first = None
+    last = 0
+    for chunk in chunks:
+        stripped = chunk.strip()
+        if stripped:
+            if first is None:
+                first = offset + len(chunk) - len(chunk.lstrip())
+            last = offset + len(chunk.rstrip())
+        offset += len(chunk)
+
+        scanner.feed(chunk)
+        if max_suspicious is not None and scanner.suspicious_count > max_suspicious:
+            break
+    else:
+        scanner.finish()
+    return (last - first if first is not None else 0), scanner.suspicious_count
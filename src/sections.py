@@ -0,0 +1,182 @@
+import re
+
+# Section names, in the order the analysis prompt asks for them
+SECTION_NAMES = ('thinking', 'step_analysis', 'tldr', 'metadata')
+
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+METADATA_MARKER = '--- ANALYSIS METADATA ---'
+
+# "## 📋 TLDR - Main Issue Summary", "## TLDR", "**TLDR:**", "TLDR:" - anchored, so it never backtracks
+TLDR_HEADING_PATTERN = re.compile(r'(?:#{1,6}[ \t]*)?(?:📋[ \t]*)?(?:\*\*)?TLDR\b', re.IGNORECASE)
+# "## 🔍 Step-by-Step Analysis", "### Step 2: ..." - the answer has started, even inside an unclosed <think>
+STEP_HEADING_PATTERN = re.compile(r'#{2,6}[ \t]*(?:🔍|Step\b)', re.IGNORECASE)
+
+class SectionScanner:
+    """Splits LLM analysis output into its sections in a single pass over the lines
+
+    Feed the whole output or streamed deltas; on_section(name, text) is called once per
+    section, when it first closes, and close() returns the parse_analysis_output dict. Markers:
+    <think>...</think>, a '## 🔍' or '### Step' heading (which also ends an unclosed <think>),
+    a TLDR heading, a '---' rule or other heading ending the TLDR (a '**Heading**' paragraph
+    ends a '**TLDR:**' block), and the '--- ANALYSIS METADATA ---' line. Text before a lone
+    '</think>' is thinking (reasoning models often omit the opening tag).
+    """
+
+    def __init__(self, on_section=None):
+        self.on_section = on_section
+        self.section = 'step_analysis'
+        self.parts = {name: [] for name in SECTION_NAMES}
+        self.thinking_done = False  # Only the first thinking block is kept
+        self.tldr_bold = False  # The TLDR started with a '**TLDR:**' heading
+        self.think_unclosed = False  # A heading ended the <think>; its late '</think>' is dropped
+        self.emitted = set()
+        self.pending = []  # Pieces of a line not yet ended by a newline
+        self.raw = []
+
+    def feed(self, text):
+        """Scan the complete lines of a new piece of output"""
+        if not text:
+            return
+        self.raw.append(text)
+        self.pending.append(text)
+        if '\n' not in text:
+            return
+        text = "".join(self.pending)
+        # The last piece may be an incomplete line continued by the next delta
+        end = text.rfind('\n')
+        self.pending = [text[end + 1:]]
+        self._scan(text[:end])
+
+    def _scan(self, text):
+        """Route complete lines; those that cannot hold a marker skip the per-line checks"""
+        for line in text.split('\n'):
+            if self.section == 'thinking' or '<' in line or '#' in line or '---' in line or '**' in line \
+                    or 'tldr' in line.lower():
+                self._line(line)
+            else:
+                self.parts[self.section].append(line)
+
+    def _switch(self, section):
+        if section != self.section:
+            self._emit(self.section)
+            self.section = section
+
+    def _emit(self, name):
+        if self.on_section and self.parts[name] and name not in self.emitted:
+            text = "\n".join(self.parts[name]).strip()
+            if text:
+                self.emitted.add(name)
+                self.on_section(name, text)
+
+    def _line(self, line):
+        """Route one line, splitting it at any <think> tags it contains"""
+        if METADATA_MARKER in line and line.strip() == METADATA_MARKER:
+            # Appended after the model output, so it also ends an unclosed <think>
+            self._switch('metadata')
+            return
+        if self.section == 'metadata':
+            self.parts['metadata'].append(line)
+            return
+        if '<' not in line and self.section != 'thinking':
+            self._text(line)
+            return
+
+        lower = line.lower()
+        pos = 0
+        while True:
+            if self.section == 'thinking':
+                if pos == 0 and '#' in line and STEP_HEADING_PATTERN.match(line.lstrip()):
+                    # The model started its answer without closing the <think>
+                    self._switch('step_analysis')
+                    self.thinking_done = True
+                    self.think_unclosed = True
+                    self._text(line)
+                    return
+                end = lower.find(THINK_CLOSE, pos)
+                if end < 0:
+                    self._think(line[pos:])
+                    return
+                self._think(line[pos:end])
+                self._switch('step_analysis')
+                self.thinking_done = True
+                pos = end + len(THINK_CLOSE)
+                continue
+
+            start = lower.find(THINK_OPEN, pos)
+            if self.think_unclosed:
+                close = lower.find(THINK_CLOSE, pos)
+                if close >= 0 and (start < 0 or close < start):
+                    self.think_unclosed = False
+                    if line[pos:close].strip():
+                        self._text(line[pos:close])
+                    pos = close + len(THINK_CLOSE)
+                    continue
+            end = lower.find(THINK_CLOSE, pos) if not self.thinking_done and self.section == 'step_analysis' else -1
+            if end >= 0 and (start < 0 or end < start):
+                # A closing tag with no opening one: everything so far was the model's reasoning
+                self.parts['thinking'] = self.parts['step_analysis']
+                self.parts['step_analysis'] = []
+                self.section = 'thinking'
+                continue
+            if start < 0:
+                if pos == 0 or line[pos:].strip():
+                    self._text(line[pos:])
+                return
+            if line[pos:start].strip():
+                self._text(line[pos:start])
+            self._switch('thinking')
+            pos = start + len(THINK_OPEN)
+
+    def _text(self, line):
+        """Route a line (or the part of one outside <think> tags) by the headings it holds"""
+        stripped = line.strip()
+        if 'tldr' in line.lower() and TLDR_HEADING_PATTERN.match(stripped):
+            self._switch('tldr')
+            self.tldr_bold = stripped.startswith('**')
+            # Keep anything after "**TLDR:**" on the heading line itself
+            remainder = stripped[TLDR_HEADING_PATTERN.match(stripped).end():].lstrip('*: ')
+            if remainder and not stripped.startswith('#'):
+                self.parts['tldr'].append(remainder)
+        elif self.section == 'tldr' and (stripped == '---' or stripped.startswith('#')):
+            # A rule or another heading ends the summary
+            self._switch('step_analysis')
+            if stripped != '---':
+                self.parts['step_analysis'].append(line)
+        elif self.section == 'tldr' and self.tldr_bold and stripped.startswith('**') and self._after_paragraph():
+            # As before: a '**TLDR:**' block runs until the next '**Heading**' paragraph
+            self._switch('step_analysis')
+            self.parts['step_analysis'].append(line)
+        else:
+            self.parts[self.section].append(line)
+
+    def _after_paragraph(self):
+        # The previous line was blank and the TLDR already has content
+        parts = self.parts['tldr']
+        return bool(parts) and not parts[-1].strip() and any(part.strip() for part in parts)
+
+    def _think(self, line):
+        if not self.thinking_done:
+            self.parts['thinking'].append(line)
+
+    def close(self):
+        """Flush the last line and section; returns the sections as parse_analysis_output does"""
+        line = "".join(self.pending)
+        self.pending = []
+        if line:
+            self._scan(line)
+        self._emit(self.section)
+        raw_output = "".join(self.raw)
+        result = {name: "\n".join(self.parts[name]).strip() for name in SECTION_NAMES}
+        result['raw_output'] = raw_output
+
+        # If no structured content was found, put everything in step_analysis
+        if not result['thinking'] and not result['tldr'] and not result['step_analysis']:
+            result['step_analysis'] = raw_output
+        return result
+
+def split_sections(text):
+    """Sections of a complete analysis output"""
+    scanner = SectionScanner()
+    scanner.feed(text)
+    return scanner.close()
\ No newline at end of file
@@ -0,0 +1,44 @@
+import re
+from records import Level
+
+# Severity keywords, highest severity first, and the level each one maps to
+SEVERITY_KEYWORDS = (
+    ('CRITICAL', Level.CRITICAL),
+    ('FATAL', Level.CRITICAL),
+    ('ERROR', Level.ERROR),
+    ('WARNING', Level.WARN),
+    ('WARN', Level.WARN),
+    ('INFO', Level.INFO),
+    ('DEBUG', Level.DEBUG),
+    ('TRACE', Level.DEBUG),
+)
+
+class SeverityClassifier:
+    """Precompiled severity classifier that upper-cases and scans each line once"""
+
+    def __init__(self, word_boundary=False):
+        self.word_boundary = word_boundary
+        # Keyword table in severity order; in word-boundary mode each keyword carries
+        # a precompiled whole-word check so INFORMATION and ERRORS=0 no longer match
+        self.table = tuple(
+            (keyword, level, re.compile(rf'\b{keyword}\b').search if word_boundary else None)
+            for keyword, level in SEVERITY_KEYWORDS
+        )
+
+    def classify(self, line):
+        """Return the highest severity keyword level found in a line"""
+        upper = line.upper()
+        # C-level substring search beats a regex alternation in CPython, so the
+        # regex only runs to confirm a keyword that is already known to be present
+        for keyword, level, whole_word in self.table:
+            if keyword in upper and (whole_word is None or whole_word(upper)):
+                return level
+        return Level.UNKNOWN
+
+_classifiers = {}
+
+def get_classifier(word_boundary=False):
+    """Shared classifier instance per mode, so patterns are compiled only once"""
+    if word_boundary not in _classifiers:
+        _classifiers[word_boundary] = SeverityClassifier(word_boundary)
+    return _classifiers[word_boundary]
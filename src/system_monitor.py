@@ -1,43 +1,101 @@
-import psutil
+import os
 import time
-from threading import Thread
-import json
+from collections import deque
+from threading import Thread, Event, Lock
+
+# Sampling configuration
+MONITOR_INTERVAL = float(os.getenv("MONITOR_INTERVAL", "5"))  # Seconds between background samples
+MONITOR_HISTORY_MINUTES = int(os.getenv("MONITOR_HISTORY_MINUTES", "60"))  # History kept in the ring buffer
+CPU_SAMPLE_SECONDS = 0.1  # Measurement window when a sample must be taken on demand
+
+EMPTY_SYSTEM_STATS = {
+    'cpu_percent': 0,
+    'memory_percent': 0,
+    'memory_used_mb': 0,
+    'memory_total_mb': 0,
+    'disk_usage_percent': 0,
+    'network_sent_mb': 0,
+    'network_recv_mb': 0
+}
+
+def _psutil():
+    # Imported when the first sample is taken, not when the app starts
+    import psutil
+    return psutil
 
 class SystemMonitor:
-    def __init__(self):
+    """Samples system and process stats on a background thread into a fixed-size ring buffer"""
+
+    def __init__(self, interval=MONITOR_INTERVAL, history_minutes=MONITOR_HISTORY_MINUTES):
+        self.interval = interval
         self.monitoring = False
-        self.stats = {
-            'cpu_percent': 0,
-            'memory_percent': 0,
-            'memory_used_mb': 0,
-            'memory_total_mb': 0,
-            'disk_usage_percent': 0,
-            'network_sent_mb': 0,
-            'network_recv_mb': 0
-        }
-    
-    def get_current_stats(self):
-        """Get current system statistics"""
+        self.history = deque(maxlen=max(1, int(history_minutes * 60 / interval)))
+        self.process = None  # psutil.Process, kept so process CPU is measured between samples
+        self.stop_event = Event()
+        self.lock = Lock()
+        self.thread = None
+        self.stats = dict(EMPTY_SYSTEM_STATS)
+
+    def start(self):
+        """Start the sampler thread (idempotent)"""
+        with self.lock:
+            if self.monitoring:
+                return
+            self.monitoring = True
+            self.stop_event.clear()
+            self.thread = Thread(target=self._run, name='system-monitor', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.monitoring = False
+        self.stop_event.set()
+
+    def _current_process(self):
+        with self.lock:
+            if self.process is None:
+                self.process = _psutil().Process()
+            return self.process
+
+    def _run(self):
+        # Prime the CPU counters: non-blocking cpu_percent reports usage since the previous call
+        _psutil().cpu_percent(interval=None)
+        self._current_process().cpu_percent()
+        self.stop_event.wait(CPU_SAMPLE_SECONDS)
+        while not self.stop_event.is_set():
+            self._record(self._sample())
+            self.stop_event.wait(self.interval)
+
+    def _record(self, sample):
+        with self.lock:
+            self.history.append(sample)
+        self.stats = sample['system']
+
+    def _sample(self, cpu_interval=None):
+        return {'system': self._system_stats(cpu_interval), 'process': self._process_stats()}
+
+    def _system_stats(self, cpu_interval=None):
         try:
+            psutil = _psutil()
+
             # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            
+            cpu_percent = psutil.cpu_percent(interval=cpu_interval)
+
             # Memory usage
             memory = psutil.virtual_memory()
             memory_percent = memory.percent
             memory_used_mb = round(memory.used / (1024 * 1024), 2)
             memory_total_mb = round(memory.total / (1024 * 1024), 2)
-            
+
             # Disk usage (root directory)
             disk = psutil.disk_usage('/')
             disk_usage_percent = round((disk.used / disk.total) * 100, 2)
-            
+
             # Network I/O
             network = psutil.net_io_counters()
             network_sent_mb = round(network.bytes_sent / (1024 * 1024), 2)
             network_recv_mb = round(network.bytes_recv / (1024 * 1024), 2)
-            
-            self.stats = {
+
+            return {
                 'cpu_percent': round(cpu_percent, 1),
                 'memory_percent': round(memory_percent, 1),
                 'memory_used_mb': memory_used_mb,
@@ -47,25 +105,12 @@ class SystemMonitor:
                 'network_recv_mb': network_recv_mb,
                 'timestamp': time.time()
             }
-            
-            return self.stats
         except Exception as e:
-            return {
-                'error': f"Failed to get system stats: {str(e)}",
-                'cpu_percent': 0,
-                'memory_percent': 0,
-                'memory_used_mb': 0,
-                'memory_total_mb': 0,
-                'disk_usage_percent': 0,
-                'network_sent_mb': 0,
-                'network_recv_mb': 0,
-                'timestamp': time.time()
-            }
-    
-    def get_process_info(self):
-        """Get information about the current Python process"""
+            return dict(EMPTY_SYSTEM_STATS, error=f"Failed to get system stats: {str(e)}", timestamp=time.time())
+
+    def _process_stats(self):
         try:
-            process = psutil.Process()
+            process = self._current_process()
             return {
                 'pid': process.pid,
                 'cpu_percent': round(process.cpu_percent(), 2),
@@ -77,5 +122,44 @@ class SystemMonitor:
         except Exception as e:
             return {'error': f"Failed to get process info: {str(e)}"}
 
+    def latest(self):
+        """Most recent sample; sampled on demand only before the first background sample exists"""
+        self.start()
+        try:
+            return self.history[-1]
+        except IndexError:
+            return self._sample(CPU_SAMPLE_SECONDS)
+
+    def get_current_stats(self):
+        """Get current system statistics"""
+        return self.latest()['system']
+
+    def get_process_info(self):
+        """Get information about the current Python process"""
+        return self.latest()['process']
+
+    def get_history(self, minutes=5):
+        """Min/max/avg of each numeric stat over the last N minutes of samples"""
+        self.start()
+        cutoff = time.time() - minutes * 60
+        with self.lock:
+            samples = [s for s in self.history if s['system'].get('timestamp', 0) >= cutoff]
+
+        summary = {'window_minutes': minutes, 'samples': len(samples), 'interval_seconds': self.interval}
+        for section in ('system', 'process'):
+            values = {}
+            for sample in samples:
+                for name, value in sample[section].items():
+                    if name not in ('timestamp', 'pid') and isinstance(value, (int, float)):
+                        values.setdefault(name, []).append(value)
+            summary[section] = {
+                name: {'min': min(series), 'max': max(series), 'avg': round(sum(series) / len(series), 2)}
+                for name, series in values.items()
+            }
+        if samples:
+            summary['start'] = samples[0]['system'].get('timestamp')
+            summary['end'] = samples[-1]['system'].get('timestamp')
+        return summary
+
 # Global monitor instance
 monitor = SystemMonitor()
\ No newline at end of file
@@ -0,0 +1,210 @@
+import os
+import time
+import bisect
+import calendar
+import threading
+from collections import OrderedDict
+from itertools import chain, islice
+from records import Level, note_record
+from parser import stream_log
+from metrics import stage_seconds
+from timestamps import parse_time, record_time, format_time, YEARLESS_YEAR
+from lineindex import line_indexes, at_least
+
+# Time window configuration
+DEFAULT_WINDOW_MINUTES = float(os.getenv("DEFAULT_WINDOW_MINUTES", "10"))  # Used when only a time is given
+MAX_WINDOW_MINUTES = 7 * 24 * 60
+TIME_INDEX_CACHE_SIZE = int(os.getenv("TIME_INDEX_CACHE_SIZE", "32"))  # Files whose index stays in memory
+
+class EmptyWindowError(ValueError):
+    """Raised when no timestamped record of a log falls inside the requested window"""
+
+class TimeIndex:
+    """Timestamps of a log's records sorted by time, each with its record's position in the parsed stream"""
+
+    def __init__(self, times, positions, records, ordered, first_critical=None, yearless=False):
+        self.times = times
+        self.positions = positions
+        self.records = records  # All records, with or without a timestamp
+        self.ordered = ordered  # Timestamps already ascended in file order
+        self.first_critical = first_critical  # Time of the first CRITICAL record in file order
+        self.yearless = yearless  # No timestamp carried a year (syslog, Cisco)
+
+    def span(self, start, end):
+        """(first position, last position, timestamped records) inside [start, end], or None
+
+        Two binary searches over the sorted times; no records are read.
+        """
+        low = bisect.bisect_left(self.times, start)
+        high = bisect.bisect_right(self.times, end)
+        if low == high:
+            return None
+        if self.ordered:
+            return self.positions[low], self.positions[high - 1], high - low
+        positions = self.positions[low:high]
+        return min(positions), max(positions), high - low
+
+def build_time_index(records):
+    """Index a stream of records by timestamp in a single pass"""
+    return _index_entries(record_time(record) + (record.level,) for record in records)
+
+def _index_entries(entries):
+    """TimeIndex from (time or None, has year, level) per record, in file order"""
+    times = []
+    positions = []
+    ordered = True
+    yearless = True
+    first_critical = None
+    latest = None
+    count = 0
+    for position, (moment, has_year, level) in enumerate(entries):
+        count += 1
+        if moment is None:
+            # Continuation lines (stack traces, wrapped messages) belong to the last stamped record
+            if first_critical is None and level == Level.CRITICAL and latest is not None:
+                first_critical = latest
+            continue
+        if has_year:
+            yearless = False
+        if times and moment < times[-1]:
+            ordered = False
+        times.append(moment)
+        positions.append(position)
+        latest = moment
+        if first_critical is None and level == Level.CRITICAL:
+            first_critical = moment
+
+    if not ordered:
+        order = sorted(range(len(times)), key=times.__getitem__)
+        times = [times[i] for i in order]
+        positions = [positions[i] for i in order]
+    return TimeIndex(times, positions, count, ordered, first_critical, yearless and bool(times))
+
+class TimeIndexCache:
+    """LRU of built indexes, keyed by file path, size and modification time"""
+
+    def __init__(self, max_entries=TIME_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, filepath, log_format=None):
+        stat = os.stat(filepath)
+        key = (os.path.realpath(filepath), stat.st_size, stat.st_mtime_ns, log_format)
+        with self.lock:
+            index = self.entries.get(key)
+            if index is not None:
+                self.entries.move_to_end(key)
+                return index
+
+        # Large raw logs already have per-line timestamps in their line index
+        line_index = line_indexes.get(filepath, log_format)
+        with stage_seconds.time(stage='time_index'):
+            if line_index is not None:
+                index = _index_entries(line_index.entries())
+            else:
+                index = build_time_index(stream_log(filepath, log_format))
+
+        with self.lock:
+            self.entries[key] = index
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return index
+
+class TimeWindow:
+    """±minutes around a moment, or the minutes leading up to the first CRITICAL record"""
+
+    def __init__(self, minutes=DEFAULT_WINDOW_MINUTES, around=None, before_critical=False, yearless=False):
+        self.minutes = minutes
+        self.around = around
+        self.before_critical = before_critical
+        self.yearless = yearless  # The requested time was given without a year
+
+    def bounds(self, index):
+        """Start and end epoch seconds of the window in the given log"""
+        if self.before_critical:
+            if index.first_critical is None:
+                raise EmptyWindowError("No timestamped CRITICAL record found in the log")
+            return index.first_critical - self.minutes * 60, index.first_critical
+
+        around = self.around
+        year = None
+        if index.yearless:
+            # The log has no years, so compare the requested time on the same placeholder year
+            year = YEARLESS_YEAR
+        elif self.yearless and index.times:
+            # A time without a year is taken in the year the log starts
+            year = time.gmtime(index.times[0]).tm_year
+        if year is not None:
+            moment = time.gmtime(around)
+            around = calendar.timegm((year,) + tuple(moment[1:6])) + around % 1
+        return around - self.minutes * 60, around + self.minutes * 60
+
+    def describe(self, index=None):
+        if self.before_critical:
+            return f"{self.minutes:g} minutes before the first CRITICAL"
+        yearless = self.yearless or (index is not None and index.yearless)
+        return f"±{self.minutes:g} minutes around {format_time(self.around, yearless)}"
+
+def parse_window(around=None, minutes=None, before_critical=None):
+    """TimeWindow from request parameters, or None when no window was asked for; raises ValueError"""
+    before_critical = str(before_critical or '').strip().lower() in ('1', 'true', 'on', 'yes')
+    around = str(around or '').strip()
+    if not around and not before_critical:
+        return None
+    if around and before_critical:
+        raise ValueError("Choose either a time to center the window on or the first CRITICAL, not both")
+
+    try:
+        minutes = float(minutes) if minutes not in (None, '') else DEFAULT_WINDOW_MINUTES
+    except (TypeError, ValueError):
+        raise ValueError("Window minutes must be a number")
+    if not 0 < minutes <= MAX_WINDOW_MINUTES:
+        raise ValueError(f"Window minutes must be between 0 and {MAX_WINDOW_MINUTES}")
+
+    if before_critical:
+        return TimeWindow(minutes, before_critical=True)
+    moment, has_year = parse_time(around[:100])
+    if moment is None:
+        raise ValueError("Unrecognized window time; use e.g. 2024-07-29 12:45:10 or Jul 29 12:45:10")
+    return TimeWindow(minutes, around=moment, yearless=not has_year)
+
+def _in_window(records, start, end):
+    for record in records:
+        # Out-of-order logs interleave other times inside the span; untimestamped lines stay
+        moment = record_time(record)[0]
+        if moment is None or start <= moment <= end:
+            yield record
+
+def windowed_log(filepath, window, log_format=None, min_level=None):
+    """Records of a log inside a time window, found by binary search over the file's timestamp index
+
+    Raises EmptyWindowError when the window holds no timestamped records.
+    """
+    index = time_indexes.get(filepath, log_format)
+    start, end = window.bounds(index)
+    span = index.span(start, end)
+    if span is None:
+        raise EmptyWindowError(f"No timestamped records fall {window.describe(index)} "
+                               f"({format_time(start, index.yearless)} to {format_time(end, index.yearless)})")
+
+    first, last, matched = span
+    line_index = line_indexes.get(filepath, log_format)
+    if line_index is not None:
+        # Only the window's byte range of the mapped file is read and parsed
+        records = line_index.records(first, last, min_level)
+    else:
+        # Parsing stops at the last record of the window instead of running to the end of the file
+        records = islice(stream_log(filepath, log_format), first, last + 1)
+        if min_level:
+            records = at_least(records, min_level)
+    if not index.ordered:
+        records = _in_window(records, start, end)
+
+    description = f"{window.describe(index)}: {matched} of {index.records} records, lines {first + 1}-{last + 1}"
+    if min_level:
+        description += f", {min_level.name} and above"
+    return chain([note_record(f"[TIME WINDOW - {description}]")], records)
+
+# Global index cache
+time_indexes = TimeIndexCache()
\ No newline at end of file
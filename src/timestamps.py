@@ -0,0 +1,69 @@
+import re
+import time
+import calendar
+from records import KIND_NOTE
+
+# Timestamp extraction configuration
+TIMESTAMP_SEARCH_CHARS = 64  # Plain text lines carry their timestamp near the start
+YEARLESS_YEAR = 2000  # Syslog and Cisco stamps have no year; a leap year keeps Feb 29 valid
+
+MONTHS = {name: number for number, name in enumerate(calendar.month_abbr) if name}
+MONTH_NAMES = '|'.join(MONTHS)
+
+# One pattern for every timestamp style the parsers see, tried left to right on each line
+TIMESTAMP_PATTERN = re.compile(
+    # ISO 8601 and its log variants: 2024-07-29T12:45:10.000Z, 2024-07-29 12:45:10,123
+    r'(?<!\d)(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})[T ](?P<hour>\d{2}):(?P<minute>\d{2})'
+    r'(?::(?P<second>\d{2})(?:[.,](?P<fraction>\d{1,9}))?)?(?:\s?(?P<tz>Z|[+-]\d{2}:?\d{2})\b)?'
+    # Syslog and Cisco IOS: Jul 29 12:45:10, *Jan 29 2024 12:45:10.123
+    rf'|\b(?P<smonth>{MONTH_NAMES})\s+(?P<sday>\d{{1,2}})\s+(?:(?P<syear>\d{{4}})\s+)?'
+    r'(?P<shour>\d{2}):(?P<sminute>\d{2})(?::(?P<ssecond>\d{2})(?:\.(?P<sfraction>\d{1,9}))?)?'
+    # Web server access logs: 29/Jul/2024:12:45:10 +0000
+    rf'|\b(?P<cday>\d{{2}})/(?P<cmonth>{MONTH_NAMES})/(?P<cyear>\d{{4}}):'
+    r'(?P<chour>\d{2}):(?P<cminute>\d{2}):(?P<csecond>\d{2})(?:\s(?P<ctz>[+-]\d{4}))?'
+)
+
+def _utc_offset(tz):
+    if not tz or tz == 'Z':
+        return 0
+    digits = tz[1:].replace(':', '')
+    offset = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+    return -offset if tz[0] == '-' else offset
+
+def _epoch(year, month, day, hour, minute, second, fraction, tz):
+    if not (1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and second <= 60):
+        return None
+    moment = calendar.timegm((year, month, day, hour, minute, second))
+    if fraction:
+        moment += int(fraction) / 10 ** len(fraction)
+    return moment - _utc_offset(tz)
+
+def _match_time(match, default_year):
+    """(epoch seconds, whether the stamp had a year) for a TIMESTAMP_PATTERN match"""
+    group = match.group
+    if group('year'):
+        return _epoch(int(group('year')), int(group('month')), int(group('day')), int(group('hour')),
+                      int(group('minute')), int(group('second') or 0), group('fraction'), group('tz')), True
+    if group('smonth'):
+        year = group('syear')
+        return _epoch(int(year) if year else default_year, MONTHS[group('smonth')], int(group('sday')),
+                      int(group('shour')), int(group('sminute')), int(group('ssecond') or 0),
+                      group('sfraction'), None), bool(year)
+    return _epoch(int(group('cyear')), MONTHS[group('cmonth')], int(group('cday')), int(group('chour')),
+                  int(group('cminute')), int(group('csecond')), None, group('ctz')), True
+
+def parse_time(text, default_year=YEARLESS_YEAR):
+    """(epoch seconds, has year) of the first timestamp in text, or (None, False); naive times are UTC"""
+    match = TIMESTAMP_PATTERN.search(text)
+    if not match:
+        return None, False
+    return _match_time(match, default_year)
+
+def record_time(record, default_year=YEARLESS_YEAR):
+    """Timestamp of a record: its parsed timestamp field, or one at the start of a plain text line"""
+    if record.kind == KIND_NOTE:
+        return None, False
+    return parse_time(record.timestamp or record.message[:TIMESTAMP_SEARCH_CHARS], default_year)
+
+def format_time(moment, yearless=False):
+    return time.strftime('%b %d %H:%M:%S' if yearless else '%Y-%m-%d %H:%M:%S', time.gmtime(moment))
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+
+# Token budget configuration
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "32768"))  # Context window of the loaded model
+MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", "2000"))  # Most output tokens an analysis may request
+MIN_OUTPUT_TOKENS = int(os.getenv("MIN_OUTPUT_TOKENS", "600"))  # Below this an RCA cannot include all its sections
+TOKENIZER = os.getenv("TOKENIZER", "heuristic")  # 'heuristic' or 'tiktoken' (optional dependency)
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+CHARS_PER_TOKEN = 3.0  # Conservative for logs: digits, IDs and punctuation split into many tokens
+MESSAGE_OVERHEAD_TOKENS = 8  # Chat template tokens around each message
+CONTEXT_SAFETY_MARGIN = 0.05  # Share of the context left free for estimation error
+
+def heuristic_count(text):
+    """Fast token estimate from the character count"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def _load_tokenizer():
+    """Tokenizer named by TOKENIZER, falling back to the heuristic when it is unavailable"""
+    if TOKENIZER == 'tiktoken':
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception:
+            # Not installed, or the encoding could not be loaded (e.g. offline)
+            pass
+    return heuristic_count
+
+_tokenizer = None
+
+def set_tokenizer(count):
+    """Plug in a token counter: a callable taking text and returning its token count"""
+    global _tokenizer
+    _tokenizer = count
+
+def count_tokens(text):
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = _load_tokenizer()
+    return _tokenizer(text)
+
+def count_message_tokens(messages):
+    """Prompt tokens of a chat request"""
+    return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+class BudgetPlan:
+    """Outcome of planning one request against the context window"""
+    __slots__ = ('prompt_tokens', 'max_tokens', 'context_tokens', 'fits')
+
+    def __init__(self, prompt_tokens, max_tokens, context_tokens, fits):
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.context_tokens = context_tokens
+        self.fits = fits
+
+    def describe(self):
+        return f"~{self.prompt_tokens} prompt tokens, max_tokens {self.max_tokens} (context {self.context_tokens})"
+
+class TokenBudgetPlanner:
+    """Chooses how much log fits in a prompt and how many output tokens to request"""
+
+    def __init__(self, context_tokens=MODEL_CONTEXT_TOKENS, max_output=MAX_OUTPUT_TOKENS, min_output=MIN_OUTPUT_TOKENS):
+        self.context_tokens = context_tokens
+        self.max_output = max_output
+        self.min_output = min_output
+
+    @property
+    def usable_tokens(self):
+        return int(self.context_tokens * (1 - CONTEXT_SAFETY_MARGIN))
+
+    def log_char_budget(self, overhead_messages, max_chars, max_output=None):
+        """Characters of log text that fit beside a prompt's fixed messages and the answer
+
+        A full-size answer is reserved when the context has room; in small contexts the
+        remaining room is split between log and answer, never below the minimum answer.
+        """
+        output = self.max_output if max_output is None else max_output
+        room = self.usable_tokens - count_message_tokens(overhead_messages)
+        reserved = min(output, max(min(self.min_output, output), room // 2))
+        return max(0, min(max_chars, int((room - reserved) * CHARS_PER_TOKEN)))
+
+    def plan(self, messages, max_output=None):
+        """Request as many output tokens as the context leaves room for, up to the configured maximum"""
+        output = self.max_output if max_output is None else max_output
+        prompt_tokens = count_message_tokens(messages)
+        max_tokens = min(output, self.usable_tokens - prompt_tokens)
+        return BudgetPlan(prompt_tokens, max(0, max_tokens), self.context_tokens,
+                          max_tokens >= min(self.min_output, output))
+
+    def shrink_ratio(self, plan, log_text):
+        """Factor to scale the log part of a prompt by so the next attempt fits"""
+        excess = plan.prompt_tokens - (self.usable_tokens - self.min_output)
+        log_tokens = max(1, count_tokens(log_text))
+        return max(0.05, min(0.9, (log_tokens - excess) / log_tokens * 0.9))
+
+# Global planner instance
+planner = TokenBudgetPlanner()
@@ -1,45 +1,60 @@
 import os
+import hashlib
+import tempfile
 import mimetypes
 from werkzeug.utils import secure_filename
 from pathlib import Path
+from parser import sniff_log_format
+from compression import LOG_EXTENSIONS, compression_kind, is_log_name
 
 # Security configuration
-ALLOWED_EXTENSIONS = {'.log', '.txt', '.json', '.csv'}
+ALLOWED_EXTENSIONS = set(LOG_EXTENSIONS)
+COMPRESSED_EXTENSIONS = {'.gz', '.zst', '.zip', '.tar', '.tgz'}  # app.log.gz, logs.zip, logs.tar.gz, ...
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB limit
 ALLOWED_MIME_TYPES = {
     'text/plain', 'application/json', 'text/csv', 
-    'application/csv', 'text/x-log', 'application/octet-stream'
+    'application/csv', 'text/x-log', 'application/octet-stream',
+    'application/gzip', 'application/zstd', 'application/zip', 'application/x-tar'
 }
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Uploads are copied to disk in 64KB chunks
 
-def validate_file_security(file):
-    """Comprehensive file security validation"""
+class StoredUpload:
+    """An upload saved to disk, with the content hash and format found while copying it"""
+    __slots__ = ('path', 'sha256', 'size', 'log_format', 'duplicate')
+
+    def __init__(self, path, sha256, size, log_format, duplicate):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.log_format = log_format
+        self.duplicate = duplicate  # True when identical content was already stored
+
+def validate_file_name(file):
+    """Extension and MIME type checks that need only the file name"""
     if not file or not file.filename:
         return False, "No file provided"
     
-    # Check file extension
+    # Check file extension: a log, a compressed log (app.log.gz) or an archive of logs
     file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        return False, f"File type {file_ext} not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+    kind = compression_kind(file.filename)
+    if file_ext not in ALLOWED_EXTENSIONS and not (kind in ('zip', 'tar') or (kind and is_log_name(file.filename))):
+        allowed = ', '.join(sorted(ALLOWED_EXTENSIONS | COMPRESSED_EXTENSIONS))
+        return False, f"File type {file_ext} not allowed. Allowed: {allowed}"
     
     # Check MIME type
     mime_type, _ = mimetypes.guess_type(file.filename)
     if mime_type and mime_type not in ALLOWED_MIME_TYPES:
         return False, f"MIME type {mime_type} not allowed"
     
-    # Check file size (read first chunk to estimate)
-    file.seek(0, 2)  # Seek to end
-    size = file.tell()
-    file.seek(0)  # Reset to beginning
-    
-    if size > MAX_FILE_SIZE:
-        return False, f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
-    
     return True, "File validation passed"
 
-def save_uploaded_file(uploaded_file, folder='data'):
-    """Secure file upload with comprehensive validation"""
-    # Security validation
-    is_valid, message = validate_file_security(uploaded_file)
+def store_upload(uploaded_file, folder='data'):
+    """Stream an upload to disk in one pass: hash it, enforce the size limit and sniff its format
+    
+    Files are stored under their content hash, so identical uploads share one file.
+    """
+    # Name checks first; size is enforced while copying instead of seeking through the upload
+    is_valid, message = validate_file_name(uploaded_file)
     if not is_valid:
         raise ValueError(f"Security validation failed: {message}")
     
@@ -48,20 +63,52 @@ def save_uploaded_file(uploaded_file, folder='data'):
     if not filename:
         raise ValueError("Invalid filename after security processing")
     
-    # Prevent path traversal - ensure folder is absolute and secure
-    folder = os.path.abspath(folder)
-    filepath = os.path.abspath(os.path.join(folder, filename))
-    
-    # Critical security check: ensure file stays within upload directory
-    if not filepath.startswith(folder):
-        raise ValueError("Path traversal attempt detected")
-    
     # Ensure upload directory exists
+    folder = os.path.abspath(folder)
     os.makedirs(folder, exist_ok=True)
     
-    # Save file securely
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.part')
     try:
-        uploaded_file.save(filepath)
-        return filepath
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                block = uploaded_file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_FILE_SIZE:
+                    raise ValueError(f"Security validation failed: File too large. "
+                                     f"Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB")
+                if not head:
+                    head = block
+                digest.update(block)
+                out.write(block)
+        
+        sha256 = digest.hexdigest()
+        # Compressed files keep both suffixes (.log.gz, .tar.gz) so the parser knows what is inside
+        suffixes = Path(filename).suffixes[-2:] if compression_kind(filename) else Path(filename).suffixes[-1:]
+        filepath = os.path.abspath(os.path.join(folder, sha256[:32] + ''.join(suffixes).lower()))
+        
+        # Critical security check: ensure file stays within upload directory
+        if not filepath.startswith(folder + os.sep):
+            raise ValueError("Path traversal attempt detected")
+        
+        duplicate = os.path.exists(filepath)
+        if duplicate:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, filepath)
     except Exception as e:
-        raise ValueError(f"Failed to save file: {str(e)}")
\ No newline at end of file
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if isinstance(e, ValueError):
+            raise
+        raise ValueError(f"Failed to save file: {str(e)}")
+    
+    # Compressed uploads are sniffed by the parser once inflated
+    log_format = None
+    if not compression_kind(filename):
+        log_format = sniff_log_format(filename, head.decode('utf-8', errors='ignore'))
+    return StoredUpload(filepath, sha256, size, log_format, duplicate)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import sys
+import socket
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mock_llm_server import MockLLMHandler
+
+class FastMockLLMHandler(MockLLMHandler):
+    first_token_delay = 0
+    chunk_delay = 0.005
+
+def start_mock_server(handler=FastMockLLMHandler):
+    """Serve handler on an ephemeral port in a background thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def closed_port_url():
+    """Base URL of a local port nothing listens on, so connections are refused"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    """App test client talking to the mock LLM server"""
+    server, base_url = start_mock_server()
+    os.environ['OPENAI_API_BASE'] = base_url
+    os.environ['STREAM_RESPONSES'] = 'true'
+    # The app writes security.log to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        import app
+        app.app.config['RATELIMIT_ENABLED'] = False
+        yield app.app.test_client()
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
\ No newline at end of file
@@ -0,0 +1,262 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from openai import APIConnectionError, APITimeoutError, InternalServerError
+
+import llm_client
+from conftest import FastMockLLMHandler, start_mock_server, closed_port_url
+from llm_client import LLMClient, BackendPool, CircuitBreaker, CircuitOpenError
+
+MESSAGES = [{'role': 'user', 'content': 'Analyze this log'}]
+
+def failing_handler():
+    """Mock handler class answering 500 while its failing flag is set; counts the completions it receives"""
+    class FailingHandler(FastMockLLMHandler):
+        failing = True
+        completions = 0
+
+        def do_GET(self):
+            if type(self).failing:
+                self._send_json({'error': {'message': 'model crashed'}}, 500)
+            else:
+                super().do_GET()
+
+        def do_POST(self):
+            type(self).completions += 1
+            if type(self).failing:
+                self._send_json({'error': {'message': 'model crashed'}}, 500)
+            else:
+                super().do_POST()
+    return FailingHandler
+
+class SlowHandler(FastMockLLMHandler):
+    first_token_delay = 2
+
+class BrokenStreamHandler(FastMockLLMHandler):
+    """Streams two chunks of a response it announced as longer, then drops the connection"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', '100000')
+        self.end_headers()
+        for piece in ('<think>', 'The pool'):
+            self._send_event({'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': 0,
+                              'model': 'mock-model',
+                              'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]})
+        self.close_connection = True
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(handler=FastMockLLMHandler):
+        server, base_url = start_mock_server(handler)
+        servers.append(server)
+        return base_url
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def new_client(base_url, threshold=5, cooldown=30, **options):
+    options.setdefault('backoff', 0)
+    return LLMClient(base_url, 'test-key', breaker=CircuitBreaker(threshold, cooldown), **options)
+
+def test_unreachable_backend_is_retried_with_jittered_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm_client, 'time', SimpleNamespace(time=time.time, sleep=delays.append))
+    client = new_client(closed_port_url(), max_retries=2, backoff=0.1)
+
+    with pytest.raises(APIConnectionError):
+        client.create(model='mock-model', messages=MESSAGES)
+
+    assert len(delays) == 2
+    assert 0.05 <= delays[0] <= 0.1
+    assert 0.1 <= delays[1] <= 0.2
+    assert len({client._retry_delay(0) for _ in range(20)}) > 1
+    stats = client.stats()
+    assert (stats['calls'], stats['retries'], stats['failures']) == (1, 2, 1)
+    assert stats['consecutive_failures'] == 3
+
+def test_read_timeout_fails_the_call_and_is_retried(mock_server):
+    client = new_client(mock_server(SlowHandler), read_timeout=0.2, max_retries=1)
+
+    started = time.time()
+    with pytest.raises(APITimeoutError):
+        client.create(model='mock-model', messages=MESSAGES)
+    assert time.time() - started < 1.5
+    assert client.stats()['retries'] == 1
+
+    # A per-call timeout overrides the read timeout
+    client = new_client(mock_server(SlowHandler), max_retries=0)
+    started = time.time()
+    with pytest.raises(APITimeoutError):
+        client.create(model='mock-model', messages=MESSAGES, timeout=0.2)
+    assert time.time() - started < 1.5
+
+def test_connect_and_read_timeouts_are_configured():
+    client = new_client(closed_port_url(), connect_timeout=0.3, read_timeout=7)
+    assert client.openai.timeout.connect == 0.3
+    assert client.openai.timeout.read == 7
+    assert client.openai.max_retries == 0
+
+def test_breaker_opens_fails_fast_and_closes_after_a_trial_call(mock_server):
+    handler = failing_handler()
+    client = new_client(mock_server(handler), threshold=2, cooldown=0.3, max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            client.create(model='mock-model', messages=MESSAGES)
+    assert client.stats()['breaker_state'] == 'open'
+
+    # Open: rejected without contacting the backend
+    with pytest.raises(CircuitOpenError):
+        client.create(model='mock-model', messages=MESSAGES)
+    assert handler.completions == 2
+    assert client.stats()['rejected'] == 1
+
+    # Half-open: a failed trial call restarts the cooldown
+    time.sleep(0.35)
+    assert client.stats()['breaker_state'] == 'half_open'
+    with pytest.raises(InternalServerError):
+        client.create(model='mock-model', messages=MESSAGES)
+    assert client.stats()['breaker_state'] == 'open'
+
+    # A successful trial call closes the circuit
+    time.sleep(0.35)
+    handler.failing = False
+    response = client.create(model='mock-model', messages=MESSAGES)
+    assert 'Root Cause' in response.choices[0].message.content
+    stats = client.stats()
+    assert (stats['breaker_state'], stats['consecutive_failures']) == ('closed', 0)
+    assert (stats['calls'], stats['failures'], stats['rejected']) == (5, 3, 1)
+
+def test_only_one_trial_call_while_half_open(mock_server):
+    client = new_client(mock_server(), threshold=1, cooldown=0.1)
+    client.breaker.record_failure()
+    time.sleep(0.15)
+
+    stream = client.create(model='mock-model', messages=MESSAGES, stream=True)
+    next(stream)
+    with pytest.raises(CircuitOpenError):
+        client.create(model='mock-model', messages=MESSAGES)
+
+    # Abandoning the trial stream frees the trial without closing the circuit
+    stream.close()
+    assert client.breaker.state == 'half_open'
+    assert not client.breaker.trial_in_flight
+
+def test_stream_failing_midway_counts_against_the_breaker(mock_server):
+    client = new_client(mock_server(BrokenStreamHandler), threshold=1)
+
+    deltas = []
+    with pytest.raises(APIConnectionError):
+        for chunk in client.create(model='mock-model', messages=MESSAGES, stream=True):
+            deltas.append(chunk.choices[0].delta.content)
+    assert deltas == ['<think>', 'The pool']
+    stats = client.stats()
+    assert (stats['failures'], stats['breaker_state']) == (1, 'open')
+
+def test_streamed_call_closes_the_breaker_when_it_completes(mock_server):
+    client = new_client(mock_server())
+    client.breaker.record_failure()
+
+    text = "".join(chunk.choices[0].delta.content or ''
+                   for chunk in client.create(model='mock-model', messages=MESSAGES, stream=True))
+    assert text.startswith('<think>')
+    assert client.stats()['consecutive_failures'] == 0
+
+def test_counters_are_exposed_in_system_stats(client, monkeypatch):
+    import app
+    pool = BackendPool([closed_port_url()], 'test-key', max_retries=1, backoff=0)
+    with pytest.raises(APIConnectionError):
+        pool.create(model='mock-model', messages=MESSAGES)
+    monkeypatch.setattr(app, 'llm_client', pool)
+
+    backend = client.get('/system_stats').get_json()['llm']['backends'][0]
+    assert (backend['calls'], backend['retries'], backend['failures']) == (1, 1, 1)
+    assert (backend['requests'], backend['in_flight'], backend['consecutive_failures']) == (1, 0, 2)
+    assert backend['last_error']
+
+def new_pool(urls, **options):
+    options.setdefault('backoff', 0)
+    options.setdefault('max_retries', 0)
+    return BackendPool(urls, 'test-key', **options)
+
+def test_calls_go_to_the_least_loaded_backend(mock_server):
+    pool = new_pool([mock_server(), mock_server()])
+    first, second = pool.backends
+
+    # Neither has answered yet: the first takes the call, and while its stream is open the second is less loaded
+    stream = pool.create(model='mock-model', messages=MESSAGES, stream=True)
+    next(stream)
+    assert (first.in_flight, second.in_flight) == (1, 0)
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert (first.requests, second.requests) == (1, 1)
+    stream.close()
+    assert first.in_flight == 0
+
+    # Queued work is weighted by latency: the slow backend only gets calls once the fast one is busy enough
+    first.latency, second.latency = 1.0, 0.1
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert (first.requests, second.requests) == (1, 2)
+    first.latency, second.latency = 1.0, 0.1
+    second.in_flight = 10
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert (first.requests, second.requests) == (2, 2)
+
+def test_failover_to_the_healthy_backend(mock_server):
+    handler = failing_handler()
+    pool = new_pool([mock_server(handler), mock_server()])
+    failing, healthy = pool.backends
+    failing.client.breaker.threshold = 2
+
+    response = pool.create(model='mock-model', messages=MESSAGES)
+    assert 'Root Cause' in response.choices[0].message.content
+    assert (failing.requests, failing.failures, healthy.requests) == (1, 1, 1)
+    assert 'model crashed' in failing.last_error
+
+    # Once its circuit opens, the failing backend is no longer tried first
+    failing.latency = healthy.latency = None
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert failing.client.breaker.state == 'open'
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert (handler.completions, healthy.requests) == (2, 3)
+    stats = pool.stats()
+    assert (stats['healthy_backends'], stats['in_flight']) == (1, 0)
+
+def test_failover_gives_up_when_every_backend_fails(mock_server):
+    pool = new_pool([mock_server(failing_handler()), closed_port_url()])
+    with pytest.raises((InternalServerError, APIConnectionError)):
+        pool.create(model='mock-model', messages=MESSAGES)
+    assert [backend.failures for backend in pool.backends] == [1, 1]
+
+def test_health_checks_take_backends_out_of_and_back_into_rotation(mock_server):
+    handler = failing_handler()
+    pool = new_pool([mock_server(handler), mock_server()], health_interval=0.05)
+    pool.set_health_probe(lambda client: bool(client.openai.models.list().data))
+    failing, healthy = pool.backends
+
+    def wait_for(condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.02)
+        return condition()
+
+    # The first call starts the health thread
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert wait_for(lambda: not failing.healthy)
+    assert healthy.healthy
+    requests = failing.requests
+    for _ in range(3):
+        pool.create(model='mock-model', messages=MESSAGES)
+    assert failing.requests == requests
+
+    handler.failing = False
+    assert wait_for(lambda: failing.healthy)
+    failing.latency, healthy.latency = 0.01, 1.0
+    pool.create(model='mock-model', messages=MESSAGES)
+    assert failing.requests == requests + 1
\ No newline at end of file
@@ -0,0 +1,21 @@
+from parser import parse_polycom_logs
+from reduction import TemplateMiner, CALL_ID_TOKEN
+
+def polycom_log(calls):
+    lines = []
+    for i, call_id in enumerate(calls):
+        lines.append(f"2024-01-29 12:45:{i:02d},456 WARN  [AudioManager] RTP packet loss detected on call ID {call_id}")
+        lines.append(f"2024-01-29 12:45:{i:02d},789 ERROR [SIP] Call-ID: {call_id}, dropped after timeout")
+    return "\n".join(lines)
+
+def test_call_ids_are_listed_per_template():
+    calls = ['alpha@pbx.local', 'bravo@pbx.local', 'charlie@pbx.local', 'delta@pbx.local']
+    miner = TemplateMiner()
+    for record in parse_polycom_logs(polycom_log(calls * 3)):
+        miner.add(record)
+
+    assert len(miner.templates) == 2
+    summary = miner.render(10000)
+    assert summary.count(CALL_ID_TOKEN) == 2
+    assert summary.count("4 calls: alpha@pbx.local, bravo@pbx.local, charlie@pbx.local, ...") == 2
+    assert 'delta@pbx.local' not in summary
\ No newline at end of file
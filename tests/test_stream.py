@@ -0,0 +1,49 @@
+import io
+import json
+import uuid
+
+def read_events(body):
+    """(event, data) pairs of a Server-Sent Events body, keepalive comments skipped"""
+    events = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_stream_emits_progress_tokens_sections_and_done(client):
+    # A fresh log each run, so the analysis is not served from the result cache
+    log = f"2024-07-29 12:45:10 ERROR Database connection pool exhausted ({uuid.uuid4().hex})\n"
+    response = client.post('/analyze', data={'incident_file': (io.BytesIO(log.encode()), 'incident.log')},
+                           headers={'Accept': 'application/json'}, content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    events = read_events(client.get(f"/stream/{job_id}").get_data(as_text=True))
+    kinds = [event for event, _ in events]
+
+    assert kinds[0] == 'progress'
+    assert kinds[-1] == 'done'
+    assert kinds.count('done') == 1
+    assert 'token' in kinds
+    # Sections close while the output streams, each after the tokens that closed it
+    assert kinds.index('token') < kinds.index('section')
+    sections = [data for event, data in events if event == 'section']
+    assert [section['name'] for section in sections] == ['thinking', 'step_analysis', 'tldr']
+    assert 'database connection timeouts' in sections[0]['text']
+    assert sections[2]['text'].startswith('**Root Cause**')
+
+    streamed = "".join(data for event, data in events if event == 'token')
+    assert streamed.startswith('<think>')
+    assert events[-1][1]['percent'] == 100
+
+def test_progress_without_id_does_not_reveal_the_latest_job(client):
+    log = f"2024-07-29 12:45:10 ERROR Disk quota exceeded ({uuid.uuid4().hex})\n"
+    response = client.post('/analyze', data={'incident_file': (io.BytesIO(log.encode()), 'incident.log')},
+                           headers={'Accept': 'application/json'}, content_type='multipart/form-data')
+    job_id = response.get_json()['job_id']
+
+    progress = client.get('/progress').get_json()
+    assert 'job_id' not in progress
+    assert job_id not in client.get('/progress').get_data(as_text=True)
+    assert client.get(f"/progress/{job_id}").get_json()['job_id'] == job_id
\ No newline at end of file